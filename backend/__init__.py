@@ -1,62 +1,139 @@
-from flask import Flask
+import os
+
+import click
+from flask import Flask, Response
 from .auth import auth_bp
 from .notes import notes_bp
 from .tags import tag_bp
-from .models import Base
-from .database import engine
+from .sync import sync_bp
+from .transfer import transfer_bp
+from .database import configure_engine, get_engine, close_request_session, get_pool_stats
+from .json_provider import make_json_provider
+from .tag_cache import use_redis_backend
+from . import tag_counts
+from . import instrumentation
+from . import compression
 from flask_cors import CORS
-from sqlalchemy import text
+
+
+DEFAULT_CONFIG = {
+    "JWT_SECRET_KEY": os.environ.get(
+        "JWT_SECRET_KEY", "f9b8c1e2d3a4b5c6f7e8d9a0b1c2d3e4f5a6b7c8d9e0f1a2b3c4d5e6f7a8b9c0"
+    ),
+    # "auto" uses orjson when installed, see json_provider.make_json_provider
+    "JSON_PROVIDER": os.environ.get("JSON_PROVIDER", "auto"),
+    # Share the per-user tag cache between workers; unset keeps it in-process
+    "TAG_CACHE_REDIS_URL": os.environ.get("TAG_CACHE_REDIS_URL"),
+}
+
+# app.config keys forwarded to database.configure_engine (unset keys keep the env defaults)
+ENGINE_CONFIG_KEYS = {
+    "DATABASE_URL": "url",
+    "DB_POOL_SIZE": "pool_size",
+    "DB_MAX_OVERFLOW": "max_overflow",
+    "DB_POOL_TIMEOUT": "pool_timeout",
+    "DB_POOL_RECYCLE": "pool_recycle",
+    "DB_POOL_PRE_PING": "pool_pre_ping",
+}
+
 
 # -----------------------------
 # Flask app
 # -----------------------------
-from flask_cors import CORS
- 
-app = Flask(__name__)
-CORS(app)
-
-CORS(
-    app,
-    resources={r"/api/*": {"origins": "*"}},
-    supports_credentials=True
-)
-
-
-
-# Test route
-@app.route("/ping")
-def ping():
-    return {"message": "pong from backend"}
-
-app.config["JWT_SECRET_KEY"] = "f9b8c1e2d3a4b5c6f7e8d9a0b1c2d3e4f5a6b7c8d9e0f1a2b3c4d5e6f7a8b9c0"
-
-# Register blueprints
-app.register_blueprint(auth_bp, url_prefix="/api")
-app.register_blueprint(notes_bp, url_prefix="/api")
-app.register_blueprint(tag_bp, url_prefix="/api")
-
-# Create tables
-with engine.begin() as conn:
-    Base.metadata.create_all(conn)
-    
-    # Migration: Add is_deleted column if it doesn't exist
-    try:
-        result = conn.execute(text("""
-            SELECT COUNT(*) as count
-            FROM information_schema.COLUMNS
-            WHERE TABLE_SCHEMA = DATABASE()
-            AND TABLE_NAME = 'note'
-            AND COLUMN_NAME = 'is_deleted'
-        """))
-        
-        count = result.fetchone()[0]
-        
-        if count == 0:
-            # Column doesn't exist, add it
-            conn.execute(text("""
-                ALTER TABLE note
-                ADD COLUMN is_deleted BOOLEAN NOT NULL DEFAULT FALSE
-            """))
-            print("✅ Successfully added 'is_deleted' column to 'note' table")
-    except Exception as e:
-        print(f"⚠️  Migration check failed (this is OK if column already exists): {str(e)}")
+def create_app(config=None):
+    """
+    Build the Flask app. Does not touch the database: the engine is created on
+    first use in each process, and schema changes run via `flask migrate`.
+    """
+    app = Flask(__name__)
+    app.config.from_mapping(DEFAULT_CONFIG)
+    if config:
+        app.config.from_mapping(config)
+
+    configure_engine(**{
+        option: app.config.get(key) for key, option in ENGINE_CONFIG_KEYS.items()
+    })
+
+    app.json = make_json_provider(app, app.config["JSON_PROVIDER"])
+    if app.config.get("TAG_CACHE_REDIS_URL"):
+        use_redis_backend(app.config["TAG_CACHE_REDIS_URL"])
+    # Serve tag counts from tag_note_count (see tag_counts.py); unset keeps the env default
+    if app.config.get("TAG_COUNTS_TABLE") is not None:
+        tag_counts.TAG_COUNTS_TABLE = bool(app.config["TAG_COUNTS_TABLE"])
+
+    CORS(
+        app,
+        resources={r"/api/*": {"origins": "*"}},
+        supports_credentials=True
+    )
+
+    # Test route
+    @app.route("/ping")
+    def ping():
+        return {"message": "pong from backend"}
+
+    # Connection pool usage, for sizing DB_POOL_SIZE / DB_MAX_OVERFLOW against the worker count
+    @app.route("/pool-stats")
+    def pool_stats():
+        return get_pool_stats()
+
+    # Per-endpoint query counts and latency, scraped by Prometheus
+    instrumentation.init_app(app)
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(instrumentation.metrics.render(), content_type=instrumentation.METRICS_CONTENT_TYPE)
+
+    # gzip/br/zstd for JSON and NDJSON bodies; registered after the metrics hook so it
+    # runs first and the compression time is part of the measured latency
+    compression.init_app(app)
+
+    # One shared DB session per request, released when the request ends
+    app.teardown_appcontext(close_request_session)
+
+    # Register blueprints
+    app.register_blueprint(auth_bp, url_prefix="/api")
+    app.register_blueprint(notes_bp, url_prefix="/api")
+    app.register_blueprint(tag_bp, url_prefix="/api")
+    app.register_blueprint(sync_bp, url_prefix="/api")
+    app.register_blueprint(transfer_bp, url_prefix="/api")
+
+    register_commands(app)
+    return app
+
+
+# -----------------------------
+# CLI commands (flask --app backend <command>)
+# -----------------------------
+def register_commands(app):
+    @app.cli.command("migrate")
+    @click.option("--dry-run", is_flag=True, help="Print the DDL instead of executing it.")
+    @click.option("--target", default=None, type=int, help="Stop after this migration version.")
+    def migrate_command(dry_run, target):
+        """Create missing tables and apply pending schema migrations."""
+        from .migrations import migrate
+        applied = migrate(get_engine(), dry_run=dry_run, target=target, out=click.echo)
+        if dry_run:
+            click.echo(f"-- dry run: {len(applied)} pending migration(s), nothing executed")
+        else:
+            click.echo(f"Applied {len(applied)} migration(s); schema is up to date")
+
+    @app.cli.command("rebuild-tag-counts")
+    def rebuild_tag_counts_command():
+        """Recompute tag_note_count from note_tags (run after enabling TAG_COUNTS_TABLE)."""
+        from .database import SessionLocal
+        with SessionLocal() as db:
+            rows = tag_counts.rebuild_tag_counts(db)
+        click.echo(f"Rebuilt note counts for {rows} tag(s)")
+
+    @app.cli.command("purge-revoked-tokens")
+    @click.option("--batch-size", default=None, type=int, help="Rows deleted per transaction.")
+    def purge_revoked_tokens_command(batch_size):
+        """Delete token revocations whose token has expired."""
+        from .purge_revoked_tokens import purge_expired_revocations, PURGE_BATCH_SIZE
+        purged = purge_expired_revocations(batch_size or PURGE_BATCH_SIZE)
+        click.echo(f"Purged {purged} expired revoked token(s)")
+
+
+# Module-level app for `gunicorn backend:app` / `flask --app backend run`
+app = create_app()
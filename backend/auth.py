@@ -2,17 +2,26 @@ from flask import Blueprint, request, jsonify, current_app
 from sqlalchemy import select, or_
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
-import bcrypt
+import uuid
 from jose import jwt, JWTError, ExpiredSignatureError
 from pydantic import ValidationError
 from .database import get_db
 from .models import User, RevokedToken
-from .utils import get_user_id_from_token
+from .utils import get_user_id_from_token, token_jti
+from .token_cache import token_cache, hash_token
 from .schemas import SignupSchema
+from .passwords import hash_password, check_password, needs_rehash, PasswordHasherBusy
 import json
 
 auth_bp = Blueprint('auth', __name__)
 
+
+@auth_bp.errorhandler(PasswordHasherBusy)
+def password_hasher_busy(e):
+    """Fail fast while the bcrypt pool is saturated instead of piling up requests."""
+    return jsonify({"error": "Server is busy, please try again"}), 503, {"Retry-After": "1"}
+
+
 # -----------------------------
 # Helper: Authenticate JWT
 # -----------------------------
@@ -59,13 +68,13 @@ def signup():
             return jsonify({"error": "Username or email already exists"}), 400
 
         # 5️⃣ Hash password
-        hashed_password = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+        hashed_password = hash_password(password)
 
         # 6️⃣ Create new user
         new_user = User(
             username=username,
             email=email,
-            password=hashed_password.decode("utf-8")
+            password=hashed_password
         )
         db.add(new_user)
         db.commit()
@@ -96,13 +105,22 @@ def login():
         stmt = select(User).where(User.email == email)
         user = db.execute(stmt).scalars().first()
 
-        if not user or not bcrypt.checkpw(password.encode('utf-8'), user.password.encode('utf-8')):
+        if not user or not check_password(password, user.password):
             return jsonify({"error": "Invalid email or password"}), 401
 
+        # Upgrade hashes made with a different work factor while we have the plain password
+        if needs_rehash(user.password):
+            try:
+                user.password = hash_password(password)
+                db.commit()
+            except PasswordHasherBusy:
+                pass  # try again on a later login
+
         payload = {
             "sub": str(user.id),
             "iat": datetime.utcnow(),
-            "exp": datetime.utcnow() + timedelta(hours=1)
+            "exp": datetime.utcnow() + timedelta(hours=1),
+            "jti": uuid.uuid4().hex
         }
         token = jwt.encode(payload, current_app.config["JWT_SECRET_KEY"], algorithm="HS256")
         return jsonify({"token": token, "user": user.to_dict()}), 200
@@ -123,15 +141,27 @@ def logout():
         return jsonify({"error": "Invalid token format"}), 401
     token = parts[1]
 
+    # Signature and expiry were already checked by authenticate()
+    claims = jwt.get_unverified_claims(token)
+    jti = token_jti(token, claims)
+
     with next(get_db()) as db:
-        stmt = select(RevokedToken).where(RevokedToken.token == token)
+        stmt = select(RevokedToken).where(RevokedToken.jti == jti)
         existing_revocation = db.execute(stmt).scalars().first()
         if existing_revocation:
             return jsonify({"message": "Token already revoked (logged out)"}), 200
 
-        revoked_token = RevokedToken(token=token)
+        # Keep the row only as long as the token could still be presented
+        revoked_token = RevokedToken(jti=jti, expires_at=datetime.utcfromtimestamp(claims["exp"]))
         db.add(revoked_token)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent logout with the same token won the insert
+            db.rollback()
+
+        # Stop serving this token from the verification cache
+        token_cache.revoke(hash_token(token), claims["exp"])
         return jsonify({"message": "Successfully logged out"}), 200
 
 
@@ -160,11 +190,10 @@ def change_password():
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        if not bcrypt.checkpw(old_password.encode('utf-8'), user.password.encode('utf-8')):
+        if not check_password(old_password, user.password):
             return jsonify({"error": "Old password is incorrect"}), 401
 
-        hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt())
-        user.password = hashed_password.decode('utf-8')
+        user.password = hash_password(new_password)
         db.commit()
 
         return jsonify({"message": "Password changed successfully"}), 200
@@ -0,0 +1,106 @@
+# backend/bench_json.py
+#
+# Compares the two ways a full notes listing can be serialized:
+#   orm:  select(Note) + selectinload(tags) -> Note.to_dict() -> stdlib json
+#   core: NOTE_COLUMNS rows + _tags_by_note -> _note_dict()   -> orjson (if installed)
+# against a throwaway in-memory SQLite database, so it never touches real data.
+#
+# Usage:
+#   python -m backend.bench_json                  # 10k notes, 5 rounds
+#   python -m backend.bench_json --notes 50000 --rounds 3
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import create_engine, select, insert
+from sqlalchemy.orm import Session, selectinload
+
+from .json_provider import StdlibJSONProvider, make_json_provider
+from .models import Base, User, Note, Tag, note_tags
+from .notes import NOTE_COLUMNS, _note_dict, _tags_by_note
+
+
+def seed(engine, note_count, tag_count=20, tags_per_note=3):
+    Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    rng = random.Random(0)
+    with Session(engine) as db:
+        db.execute(insert(User).values(id=1, username="bench", email="bench@example.com", password="x"))
+        db.execute(insert(Tag), [{"id": i, "user_id": 1, "name": f"tag-{i}"} for i in range(1, tag_count + 1)])
+        db.execute(insert(Note), [
+            {
+                "id": i,
+                "user_id": 1,
+                "title": f"Note {i}",
+                "content": "Lorem ipsum dolor sit amet. " * rng.randint(5, 40),
+                "created_at": now - timedelta(minutes=i),
+                "updated_at": now - timedelta(seconds=i),
+            }
+            for i in range(1, note_count + 1)
+        ])
+        db.execute(insert(note_tags), [
+            {"note_id": i, "tag_id": tag_id}
+            for i in range(1, note_count + 1)
+            for tag_id in rng.sample(range(1, tag_count + 1), tags_per_note)
+        ])
+        db.commit()
+
+
+def orm_payload(engine):
+    with Session(engine) as db:
+        notes = db.execute(
+            select(Note).where(Note.user_id == 1).order_by(Note.id).options(selectinload(Note.tags))
+        ).scalars().all()
+        return [n.to_dict() for n in notes]
+
+
+def core_payload(engine):
+    with Session(engine) as db:
+        rows = db.execute(select(*NOTE_COLUMNS).where(Note.user_id == 1).order_by(Note.id)).all()
+        tags = _tags_by_note(db, [row.id for row in rows])
+        return [_note_dict(row, tags[row.id]) for row in rows]
+
+
+def measure(build, provider, engine, rounds):
+    """Median seconds for building the payload and for encoding it, plus the body size."""
+    build_times, encode_times = [], []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        payload = build(engine)
+        built = time.perf_counter()
+        body = provider.response({"success": True, "notes": payload, "next_cursor": None}).get_data()
+        build_times.append(built - started)
+        encode_times.append(time.perf_counter() - built)
+    return statistics.median(build_times), statistics.median(encode_times), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark note listing serialization.")
+    parser.add_argument("--notes", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    seed(engine, args.notes)
+    app = Flask(__name__)
+    candidates = [
+        ("orm + stdlib", orm_payload, StdlibJSONProvider(app)),
+        ("core + stdlib", core_payload, StdlibJSONProvider(app)),
+    ]
+    fast = make_json_provider(app)
+    if not isinstance(fast, StdlibJSONProvider):
+        candidates.append(("core + orjson", core_payload, fast))
+
+    print(f"{args.notes} notes, median of {args.rounds} rounds")
+    print(f"{'':16}{'build ms':>10}{'encode ms':>11}{'total ms':>10}{'bytes':>12}")
+    for name, build, provider in candidates:
+        build_s, encode_s, size = measure(build, provider, engine, args.rounds)
+        print(f"{name:16}{build_s * 1000:10.1f}{encode_s * 1000:11.1f}{(build_s + encode_s) * 1000:10.1f}{size:12,}")
+
+
+if __name__ == "__main__":
+    main()
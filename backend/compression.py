@@ -0,0 +1,203 @@
+# backend/compression.py
+#
+# Negotiated response compression. JSON/NDJSON/text responses are encoded with the
+# best encoding the client accepts (br, zstd or gzip, in that order of preference
+# on ties; br and zstd only when their packages are installed). Buffered bodies
+# below COMPRESSION_MIN_SIZE are sent as-is. Streamed bodies (export, import with
+# progress) are compressed chunk by chunk with a flush after each chunk, so the
+# client can decode every chunk as soon as it arrives.
+
+import os
+import zlib
+
+from flask import request
+from werkzeug.wsgi import ClosingIterator
+
+from .instrumentation import metrics
+
+try:
+    import brotli
+except ImportError:  # optional; br is not offered without it
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional; zstd is not offered without it
+    zstandard = None
+
+
+# -----------------------------
+# Compression config
+# -----------------------------
+# Comma-separated encodings in server preference order; "auto" is every installed
+# one, "" turns compression off
+COMPRESSION_ENCODINGS = os.environ.get("COMPRESSION_ENCODINGS", "auto")
+# Buffered responses smaller than this many bytes are not worth the CPU or headers
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+# Levels favour speed: each response is compressed on the request thread
+COMPRESSION_LEVELS = {
+    "br": int(os.environ.get("COMPRESSION_BROTLI_LEVEL", 4)),  # 0-11
+    "zstd": int(os.environ.get("COMPRESSION_ZSTD_LEVEL", 3)),  # 1-22
+    "gzip": int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6)),  # 1-9
+}
+COMPRESSIBLE_MIMETYPES = {"application/json", "application/x-ndjson", "text/plain"}
+
+
+class GzipCompressor:
+    def __init__(self, level):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._z.compress(data)
+
+    def flush(self):
+        return self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._z.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, level):
+        self._c = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._c.process(data)
+
+    def flush(self):
+        return self._c.flush()
+
+    def finish(self):
+        return self._c.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level):
+        self._c = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._c.compress(data)
+
+    def flush(self):
+        return self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._c.flush()
+
+
+COMPRESSORS = {"br": BrotliCompressor, "zstd": ZstdCompressor, "gzip": GzipCompressor}
+INSTALLED = {"br": brotli is not None, "zstd": zstandard is not None, "gzip": True}
+
+_enabled = []
+
+
+def configure(encodings="auto"):
+    """Set the offered encodings from a COMPRESSION_ENCODINGS value."""
+    global _enabled
+    if encodings == "auto":
+        _enabled = [name for name in COMPRESSORS if INSTALLED[name]]
+        return
+    names = [name.strip() for name in encodings.split(",") if name.strip()]
+    for name in names:
+        if name not in COMPRESSORS:
+            raise ValueError(f"COMPRESSION_ENCODINGS entries must be among: {', '.join(COMPRESSORS)}")
+        if not INSTALLED[name]:
+            raise RuntimeError(f"COMPRESSION_ENCODINGS includes {name} but its package is not installed")
+    _enabled = names
+
+
+configure(COMPRESSION_ENCODINGS)
+
+
+# -----------------------------
+# Negotiation
+# -----------------------------
+def negotiate_encoding(accept_encodings):
+    """The enabled encoding the client rates highest (ties go to server order), or None."""
+    best, best_quality = None, 0
+    for name in _enabled:
+        quality = accept_encodings[name]
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def _compressible(response):
+    return (
+        response.status_code == 200
+        and response.mimetype in COMPRESSIBLE_MIMETYPES
+        and "Content-Encoding" not in response.headers
+        and not response.direct_passthrough
+        and not response.cache_control.no_transform
+    )
+
+
+# -----------------------------
+# Response hook
+# -----------------------------
+def _compress_stream(chunks, encoding, compressor):
+    """Compress each chunk and flush it, so streamed progress is not held back."""
+    size_in = size_out = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if not chunk:
+                continue
+            data = compressor.compress(chunk) + compressor.flush()
+            size_in += len(chunk)
+            size_out += len(data)
+            yield data
+        data = compressor.finish()
+        size_out += len(data)
+        yield data
+    finally:
+        metrics.record_compression(encoding, size_in, size_out)
+
+
+def compress_response(response):
+    """after_request hook: encode eligible responses per the request's Accept-Encoding."""
+    if not _enabled or not _compressible(response):
+        return response
+    # Caches must key on Accept-Encoding whether or not this copy ends up compressed
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    compressor = COMPRESSORS[encoding](COMPRESSION_LEVELS[encoding])
+
+    if response.is_streamed:
+        # Closing the wrapper still closes the original iterable (and its DB session)
+        # when the client goes away, or on HEAD before the body is read at all
+        body = response.response
+        response.response = ClosingIterator(
+            _compress_stream(body, encoding, compressor), getattr(body, "close", None) or ()
+        )
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        if len(body) < COMPRESSION_MIN_SIZE:
+            return response
+        compressed = compressor.compress(body) + compressor.finish()
+        if len(compressed) >= len(body):
+            return response
+        response.set_data(compressed)
+        metrics.record_compression(encoding, len(body), len(compressed))
+
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_app(app):
+    """Apply the COMPRESSION_* app config and register the response hook on `app`."""
+    global COMPRESSION_MIN_SIZE
+    if app.config.get("COMPRESSION_ENCODINGS") is not None:
+        configure(app.config["COMPRESSION_ENCODINGS"])
+    if app.config.get("COMPRESSION_MIN_SIZE") is not None:
+        COMPRESSION_MIN_SIZE = int(app.config["COMPRESSION_MIN_SIZE"])
+    for encoding, key in (("br", "COMPRESSION_BROTLI_LEVEL"), ("zstd", "COMPRESSION_ZSTD_LEVEL"),
+                          ("gzip", "COMPRESSION_GZIP_LEVEL")):
+        if app.config.get(key) is not None:
+            COMPRESSION_LEVELS[encoding] = int(app.config[key])
+
+    app.after_request(compress_response)
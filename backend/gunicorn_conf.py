@@ -0,0 +1,30 @@
+# backend/gunicorn_conf.py
+#
+# Production serving mode with cooperative (gevent) workers:
+#
+#   gunicorn -c backend/gunicorn_conf.py "backend:app"
+#
+# Each worker runs every request in a greenlet. PyMySQL is pure Python, so once
+# gevent has patched the socket module a request waiting on MySQL yields to the
+# others, and one worker process keeps up to WORKER_CONNECTIONS requests in
+# flight instead of one per thread. Set GUNICORN_WORKER_CLASS=sync (plus
+# GUNICORN_THREADS) to fall back to plain threaded workers.
+#
+# Size the SQLAlchemy pool (DB_POOL_SIZE + DB_MAX_OVERFLOW, see database.py) to
+# the number of requests that should hit MySQL at once per worker; the rest wait
+# up to DB_POOL_TIMEOUT seconds for a connection.
+
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gevent")
+worker_connections = int(os.environ.get("WORKER_CONNECTIONS", 200))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+keepalive = 5
+
+# Import the app inside each worker, after gevent has monkey-patched the
+# standard library, so the engine and its locks are greenlet-aware.
+preload_app = False
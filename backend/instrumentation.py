@@ -0,0 +1,290 @@
+# backend/instrumentation.py
+#
+# Per-request SQL and latency metrics. Engine cursor events count statements and
+# their time into the current request (on flask `g`); after the request the totals
+# are folded into per-endpoint aggregates served by /metrics in Prometheus text
+# format. Aggregates live in the worker process, so with several gunicorn workers
+# each scrape only sees the worker that answered it.
+
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .tag_cache import tag_cache
+from .token_cache import token_cache
+
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------------
+# Instrumentation config
+# -----------------------------
+# Statements slower than this are logged (parameters redacted); 0 disables the log
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 200))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class EndpointStats:
+    __slots__ = ("requests", "statuses", "queries", "db_seconds", "serialize_seconds",
+                 "latency_seconds", "latency_buckets")
+
+    def __init__(self):
+        self.requests = 0
+        self.statuses = defaultdict(int)
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.latency_seconds = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+
+
+class RequestMetrics:
+    """Thread-safe per-(endpoint, method) aggregates plus process-wide slow query count."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = defaultdict(EndpointStats)
+        self._compression = defaultdict(lambda: [0, 0, 0])  # encoding -> [responses, bytes in, bytes out]
+        self.slow_queries = 0
+
+    def record(self, endpoint, method, status, queries, db_seconds, serialize_seconds, latency):
+        with self._lock:
+            stats = self._endpoints[(endpoint, method)]
+            stats.requests += 1
+            stats.statuses[status] += 1
+            stats.queries += queries
+            stats.db_seconds += db_seconds
+            stats.serialize_seconds += serialize_seconds
+            stats.latency_seconds += latency
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    stats.latency_buckets[i] += 1
+
+    def record_slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def record_compression(self, encoding, bytes_in, bytes_out):
+        with self._lock:
+            totals = self._compression[encoding]
+            totals[0] += 1
+            totals[1] += bytes_in
+            totals[2] += bytes_out
+
+    def clear(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._compression.clear()
+            self.slow_queries = 0
+
+    def render(self):
+        """Render the aggregates in the Prometheus text exposition format."""
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            lines = [
+                "# HELP notes_http_requests_total Requests handled, by endpoint and status.",
+                "# TYPE notes_http_requests_total counter",
+            ]
+            for (endpoint, method), stats in endpoints:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(_sample("notes_http_requests_total", count,
+                                         endpoint=endpoint, method=method, status=status))
+
+            lines += [
+                "# HELP notes_http_request_duration_seconds Time from request start to response.",
+                "# TYPE notes_http_request_duration_seconds histogram",
+            ]
+            for (endpoint, method), stats in endpoints:
+                for bound, count in zip(LATENCY_BUCKETS, stats.latency_buckets):
+                    lines.append(_sample("notes_http_request_duration_seconds_bucket", count,
+                                         endpoint=endpoint, method=method, le=bound))
+                lines.append(_sample("notes_http_request_duration_seconds_bucket", stats.requests,
+                                     endpoint=endpoint, method=method, le="+Inf"))
+                lines.append(_sample("notes_http_request_duration_seconds_sum", stats.latency_seconds,
+                                     endpoint=endpoint, method=method))
+                lines.append(_sample("notes_http_request_duration_seconds_count", stats.requests,
+                                     endpoint=endpoint, method=method))
+
+            for name, attr, help_text in (
+                ("notes_db_queries_total", "queries", "SQL statements executed while handling requests."),
+                ("notes_db_duration_seconds_total", "db_seconds", "Time spent executing SQL statements."),
+                ("notes_serialization_duration_seconds_total", "serialize_seconds",
+                 "Time spent encoding JSON responses."),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (endpoint, method), stats in endpoints:
+                    lines.append(_sample(name, getattr(stats, attr), endpoint=endpoint, method=method))
+
+            lines += [
+                f"# HELP notes_db_slow_queries_total Statements slower than {SLOW_QUERY_THRESHOLD_MS:g} ms.",
+                "# TYPE notes_db_slow_queries_total counter",
+                _sample("notes_db_slow_queries_total", self.slow_queries),
+            ]
+
+            compression = sorted(self._compression.items())
+            for name, value, help_text in (
+                ("notes_http_compressed_responses_total", lambda t: t[0], "Responses sent compressed."),
+                ("notes_http_compression_input_bytes_total", lambda t: t[1], "Body bytes before compression."),
+                ("notes_http_compression_output_bytes_total", lambda t: t[2], "Body bytes after compression."),
+                ("notes_http_compression_saved_bytes_total", lambda t: t[1] - t[2], "Body bytes saved by compression."),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for encoding, totals in compression:
+                    lines.append(_sample(name, value(totals), encoding=encoding))
+
+        lines += _cache_lines()
+        return "\n".join(lines) + "\n"
+
+
+def _cache_lines():
+    """Hit/miss counters of the per-process token and tag caches."""
+    caches = [("token", token_cache.stats()), ("tag", tag_cache.stats())]
+    lines = []
+    for name, key, help_text in (
+        ("notes_cache_hits_total", "hits", "Lookups answered from the cache."),
+        ("notes_cache_misses_total", "misses", "Lookups that fell through to the database."),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for cache, stats in caches:
+            lines.append(_sample(name, stats[key], cache=cache))
+    lines += [
+        "# HELP notes_token_cache_entries Verified tokens currently cached.",
+        "# TYPE notes_token_cache_entries gauge",
+        _sample("notes_token_cache_entries", caches[0][1]["entries"]),
+    ]
+    return lines
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _sample(name, value, **labels):
+    label_text = ",".join(f'{key}="{_label_value(val)}"' for key, val in labels.items())
+    if isinstance(value, float):
+        value = repr(round(value, 6))
+    return f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}"
+
+
+metrics = RequestMetrics()
+
+
+# -----------------------------
+# SQLAlchemy cursor events
+# -----------------------------
+def redact_parameters(parameters, executemany=False):
+    """Keep the shape of bound parameters for the log but none of their values."""
+    if executemany:
+        return f"<{len(parameters)} rows>"
+    if isinstance(parameters, dict):
+        return {key: "?" for key in parameters}
+    if isinstance(parameters, (list, tuple)):
+        return ["?"] * len(parameters)
+    return "?"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_statement(conn.info["query_start"].pop(), statement, parameters, executemany)
+
+
+def _handle_error(context):
+    # after_cursor_execute does not run for a statement that raised: pop its start
+    # here so the stack does not grow, and count it like any other statement
+    if context.connection is None or context.execution_context is None:
+        return  # failed before reaching a cursor (e.g. connecting)
+    starts = context.connection.info.get("query_start")
+    if starts:
+        _record_statement(starts.pop(), context.statement, context.parameters, context.execution_context.executemany)
+
+
+def _record_statement(started, statement, parameters, executemany):
+    elapsed = time.perf_counter() - started
+
+    if has_request_context() and "request_started" in g:
+        g.query_count += 1
+        g.db_seconds += elapsed
+
+    if SLOW_QUERY_THRESHOLD_MS and elapsed * 1000 >= SLOW_QUERY_THRESHOLD_MS:
+        metrics.record_slow_query()
+        logger.warning(
+            "Slow query (%.1f ms)%s: %s params=%s",
+            elapsed * 1000,
+            f" in {request.endpoint}" if has_request_context() else "",
+            " ".join(statement.split()),
+            redact_parameters(parameters, executemany),
+        )
+
+
+_listeners_lock = threading.Lock()
+_listening = False
+
+
+def _listen_engine_events():
+    """Attach the cursor and error hooks to every Engine (they are created lazily per process)."""
+    global _listening
+    with _listeners_lock:
+        if not _listening:
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+            event.listen(Engine, "handle_error", _handle_error)
+            _listening = True
+
+
+# -----------------------------
+# Flask request lifecycle
+# -----------------------------
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.query_count = 0
+    g.db_seconds = 0.0
+    g.serialize_seconds = 0.0
+
+
+def _finish_request(response):
+    if "request_started" in g:
+        metrics.record(
+            request.endpoint or "unmatched",
+            request.method,
+            response.status_code,
+            g.query_count,
+            g.db_seconds,
+            g.serialize_seconds,
+            time.perf_counter() - g.request_started,
+        )
+    return response
+
+
+def _timed_response(build_response):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return build_response(*args, **kwargs)
+        finally:
+            if has_request_context() and "request_started" in g:
+                g.serialize_seconds += time.perf_counter() - started
+    return wrapper
+
+
+def init_app(app):
+    """Register the engine hooks, request timing and JSON timing on `app`."""
+    global SLOW_QUERY_THRESHOLD_MS
+    if app.config.get("SLOW_QUERY_THRESHOLD_MS") is not None:
+        SLOW_QUERY_THRESHOLD_MS = float(app.config["SLOW_QUERY_THRESHOLD_MS"])
+
+    _listen_engine_events()
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    # jsonify() goes through the provider's response(), so this times every JSON body
+    app.json.response = _timed_response(app.json.response)
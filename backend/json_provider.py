@@ -0,0 +1,74 @@
+# backend/json_provider.py
+
+import dataclasses
+import decimal
+import uuid
+from datetime import date, datetime
+
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional speedup; the stdlib provider is used without it
+    orjson = None
+
+
+def _default(o):
+    """Types the encoders cannot handle natively. Datetimes are ISO 8601, like Note.to_dict()."""
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's json-module provider, but encoding datetimes as ISO 8601 instead of HTTP dates."""
+
+    default = staticmethod(_default)
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    orjson-backed provider. Encodes datetimes in C and writes the response body as
+    bytes without a str round trip. Keys are emitted in insertion order, not sorted.
+    """
+
+    option = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self.option).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=self.option | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype="application/json")
+
+
+JSON_PROVIDERS = {
+    "orjson": OrjsonProvider,
+    "stdlib": StdlibJSONProvider,
+}
+
+
+def make_json_provider(app, name="auto"):
+    """
+    Build the provider named by the JSON_PROVIDER setting: "orjson", "stdlib",
+    or "auto" (orjson when it is installed).
+    """
+    if name == "auto":
+        name = "orjson" if orjson is not None else "stdlib"
+    if name not in JSON_PROVIDERS:
+        raise ValueError(f"JSON_PROVIDER must be one of: auto, {', '.join(JSON_PROVIDERS)}")
+    if name == "orjson" and orjson is None:
+        raise RuntimeError("JSON_PROVIDER=orjson but orjson is not installed")
+    return JSON_PROVIDERS[name](app)
@@ -0,0 +1,9 @@
+DESCRIPTION = "Add note.is_deleted for the trash"
+
+
+def upgrade(op):
+    if not op.column_exists("note", "is_deleted"):
+        op.execute("""
+            ALTER TABLE note
+            ADD COLUMN is_deleted BOOLEAN NOT NULL DEFAULT FALSE
+        """)
@@ -0,0 +1,26 @@
+DESCRIPTION = "Store revoked tokens as jti + expires_at instead of the whole JWT"
+
+
+def upgrade(op):
+    if op.column_exists("revoked_token", "token"):
+        # Existing rows get the hash-prefix jti used for tokens without a `jti`
+        # claim (see utils.token_jti) and expire one token lifetime after revocation
+        op.execute("""
+            ALTER TABLE revoked_token
+            ADD COLUMN jti CHAR(32) NULL,
+            ADD COLUMN expires_at DATETIME NULL
+        """)
+        op.execute("""
+            UPDATE revoked_token
+            SET jti = LEFT(SHA2(token, 256), 32),
+                expires_at = COALESCE(revoked_at, UTC_TIMESTAMP()) + INTERVAL 1 HOUR
+        """)
+        op.execute("""
+            ALTER TABLE revoked_token
+            DROP COLUMN token,
+            MODIFY jti CHAR(32) NOT NULL,
+            MODIFY expires_at DATETIME NOT NULL
+        """)
+
+    op.create_index("ux_revoked_token_jti", "revoked_token", ["jti"], unique=True)
+    op.create_index("ix_revoked_token_expires_at", "revoked_token", ["expires_at"])
@@ -0,0 +1,9 @@
+DESCRIPTION = "Add tag.updated_at for GET /sync"
+
+
+def upgrade(op):
+    if not op.column_exists("tag", "updated_at"):
+        op.execute("""
+            ALTER TABLE tag
+            ADD COLUMN updated_at DATETIME NULL
+        """)
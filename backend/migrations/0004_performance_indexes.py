@@ -0,0 +1,18 @@
+DESCRIPTION = "Listing, sync, search and tag lookup indexes"
+
+
+def upgrade(op):
+    # Keyset pagination / ?sort= on the active and archived listings, and the trash
+    op.create_index("ix_note_user_scope_created", "note", ["user_id", "is_deleted", "is_archived", "created_at", "id"])
+    op.create_index("ix_note_user_scope_updated", "note", ["user_id", "is_deleted", "is_archived", "updated_at", "id"])
+    op.create_index("ix_note_user_scope_title", "note", ["user_id", "is_deleted", "is_archived", "title", "id"])
+    op.create_index("ix_note_user_trash_updated", "note", ["user_id", "is_deleted", "updated_at", "id"])
+    # GET /sync
+    op.create_index("ix_note_user_updated", "note", ["user_id", "updated_at", "id"])
+    op.create_index("ix_tag_user_updated", "tag", ["user_id", "updated_at"])
+    # GET /notes/search
+    op.create_index("ft_note_title_content", "note", ["title", "content"], fulltext=op.dialect == "mysql")
+    # Tag filters look notes up by tag; the primary key only serves note -> tags
+    op.create_index("ix_note_tags_tag_note", "note_tags", ["tag_id", "note_id"])
+    # Tag name lookups in create_tag / update_tag
+    op.create_index("ix_tag_user_name", "tag", ["user_id", "name"])
@@ -0,0 +1,59 @@
+from sqlalchemy import text
+
+DESCRIPTION = "Merge duplicate tags and make (user_id, name) unique"
+
+# Every tag but the oldest of each (user_id, name) group. DISTINCT keeps MySQL from
+# merging the derived table into DELETE FROM tag, which it would then refuse.
+DUPLICATES = """
+    SELECT DISTINCT t.id, t.user_id
+    FROM tag t
+    JOIN (
+        SELECT user_id, name, MIN(id) AS keep_id
+        FROM tag
+        GROUP BY user_id, name
+        HAVING COUNT(*) > 1
+    ) k ON k.user_id = t.user_id AND k.name = t.name AND t.id <> k.keep_id
+"""
+
+
+def upgrade(op):
+    duplicates = 0 if op.table_is_new("tag") else op.conn.execute(
+        text(f"SELECT COUNT(*) FROM ({DUPLICATES}) d")
+    ).scalar()
+    if duplicates:
+        merge_duplicates(op)
+        op.out(f"-- merged {duplicates} duplicate tag(s); run `flask rebuild-tag-counts` "
+               "if TAG_COUNTS_TABLE is on")
+
+    op.create_index("ux_tag_user_name", "tag", ["user_id", "name"], unique=True)
+    # The unique index serves the same lookups
+    op.drop_index("ix_tag_user_name", "tag")
+
+
+def merge_duplicates(op):
+    mysql = op.dialect == "mysql"
+    insert_ignore = "INSERT IGNORE" if mysql else "INSERT OR IGNORE"
+    now = "UTC_TIMESTAMP()" if mysql else "CURRENT_TIMESTAMP"
+
+    # Move the duplicates' notes onto the kept tag
+    op.execute(f"""
+        {insert_ignore} INTO note_tags (note_id, tag_id)
+        SELECT nt.note_id, k.keep_id
+        FROM note_tags nt
+        JOIN tag t ON t.id = nt.tag_id
+        JOIN (SELECT user_id, name, MIN(id) AS keep_id FROM tag GROUP BY user_id, name) k
+            ON k.user_id = t.user_id AND k.name = t.name AND t.id <> k.keep_id
+    """)
+    # Clients holding a duplicate learn about its removal through GET /sync
+    op.execute(f"""
+        INSERT INTO tombstone (user_id, entity, entity_id, deleted_at)
+        SELECT d.user_id, 'tag', d.id, {now} FROM ({DUPLICATES}) d
+    """)
+    op.execute(f"""
+        UPDATE user_data_version
+        SET version = version + 1, changed_at = {now}
+        WHERE user_id IN (SELECT user_id FROM ({DUPLICATES}) d)
+    """)
+    op.execute(f"DELETE FROM note_tags WHERE tag_id IN (SELECT id FROM ({DUPLICATES}) d)")
+    op.execute(f"DELETE FROM tag_note_count WHERE tag_id IN (SELECT id FROM ({DUPLICATES}) d)")
+    op.execute(f"DELETE FROM tag WHERE id IN (SELECT id FROM ({DUPLICATES}) d)")
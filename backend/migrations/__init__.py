@@ -0,0 +1,185 @@
+# backend/migrations/__init__.py
+#
+# Versioned schema migrations.
+#
+# Every module in this package named NNNN_description.py defines DESCRIPTION and
+# `upgrade(op)`. Applied versions are recorded in the `schema_version` table and
+# `flask --app backend migrate` applies the pending ones in order;
+# `--dry-run` prints the DDL instead of executing it.
+#
+# Tables that do not exist yet are created from the models first, so on a fresh
+# database the migrations only find work already done. Keep upgrade() idempotent
+# (probe with op.column_exists / op.index_exists) for databases that predate
+# this runner.
+
+import importlib
+import pkgutil
+import re
+import textwrap
+from datetime import datetime
+
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, inspect, select, insert, text
+from sqlalchemy.schema import CreateTable, CreateIndex
+
+from ..models import Base
+
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+MIGRATION_NAME = re.compile(r"^(\d{4})_\w+$")
+
+
+class Migration:
+    def __init__(self, version, name, module):
+        self.version = version
+        self.name = name
+        self.description = module.DESCRIPTION
+        self.upgrade = module.upgrade
+
+
+def load_migrations():
+    """Return all migrations in this package, ordered by version."""
+    migrations = []
+    for info in pkgutil.iter_modules(__path__):
+        match = MIGRATION_NAME.match(info.name)
+        if match:
+            module = importlib.import_module(f"{__name__}.{info.name}")
+            migrations.append(Migration(int(match.group(1)), info.name, module))
+    migrations.sort(key=lambda m: m.version)
+    return migrations
+
+
+class Operations:
+    """
+    DDL helpers handed to upgrade(); in dry-run mode changes are printed, probes still
+    run. Tables created from the models in this run (in a dry run: that would be) are
+    tracked in `new_tables`; in a dry run the probes answer for them from the model,
+    since they are not really there. Likewise a dry run records the indexes it printed
+    a CREATE or DROP for in `planned_indexes`, so a later migration probing the same
+    index sees what a real run would have left behind.
+    """
+
+    def __init__(self, conn, dry_run=False, out=print, new_tables=None, planned_indexes=None):
+        self.conn = conn
+        self.dry_run = dry_run
+        self.out = out
+        self.dialect = conn.dialect.name
+        self.new_tables = new_tables if new_tables is not None else {}
+        self.planned_indexes = planned_indexes if planned_indexes is not None else {}  # (table, name) -> exists
+
+    def quote(self, name):
+        return self.conn.dialect.identifier_preparer.quote(name)
+
+    def execute(self, sql):
+        sql = textwrap.dedent(sql).strip()
+        if self.dry_run:
+            self.out(sql + ";")
+        else:
+            self.conn.execute(text(sql))
+
+    def _planned(self, table):
+        return self.new_tables.get(table) if self.dry_run else None
+
+    def table_is_new(self, table):
+        """True if the table was created empty by this run, so there is no data to migrate."""
+        return table in self.new_tables
+
+    def table_exists(self, table):
+        return table in self.new_tables or inspect(self.conn).has_table(table)
+
+    def column_exists(self, table, column):
+        planned = self._planned(table)
+        if planned is not None:
+            return column in planned.c
+        return any(c["name"] == column for c in inspect(self.conn).get_columns(table))
+
+    def index_exists(self, table, name):
+        if self.dry_run and (table, name) in self.planned_indexes:
+            return self.planned_indexes[table, name]
+        planned = self._planned(table)
+        if planned is not None:
+            return any(i.name == name for i in planned.indexes) or any(
+                c.name == name for c in planned.constraints
+            )
+        inspector = inspect(self.conn)
+        names = {i["name"] for i in inspector.get_indexes(table)}
+        names |= {u["name"] for u in inspector.get_unique_constraints(table)}
+        return name in names
+
+    def create_index(self, name, table, columns, unique=False, fulltext=False):
+        """Add an index unless it exists; on MySQL without blocking writes to the table."""
+        if self.index_exists(table, name):
+            return
+        cols = ", ".join(self.quote(c) for c in columns)
+        if self.dialect == "mysql":
+            kind = "FULLTEXT INDEX" if fulltext else "UNIQUE INDEX" if unique else "INDEX"
+            # InnoDB builds secondary indexes in place while allowing concurrent DML;
+            # FULLTEXT indexes only support a shared lock (reads continue)
+            lock = "LOCK=SHARED" if fulltext else "ALGORITHM=INPLACE, LOCK=NONE"
+            self.execute(f"ALTER TABLE {self.quote(table)} ADD {kind} {self.quote(name)} ({cols}), {lock}")
+        else:
+            kind = "UNIQUE INDEX" if unique else "INDEX"
+            self.execute(f"CREATE {kind} {self.quote(name)} ON {self.quote(table)} ({cols})")
+        if self.dry_run:
+            self.planned_indexes[table, name] = True
+
+    def drop_index(self, name, table):
+        if not self.index_exists(table, name):
+            return
+        if self.dialect == "mysql":
+            self.execute(f"ALTER TABLE {self.quote(table)} DROP INDEX {self.quote(name)}, ALGORITHM=INPLACE, LOCK=NONE")
+        else:
+            self.execute(f"DROP INDEX {self.quote(name)}")
+        if self.dry_run:
+            self.planned_indexes[table, name] = False
+
+    def create_missing_tables(self, metadata):
+        """Create tables (with their indexes) that do not exist yet."""
+        for table in metadata.sorted_tables:
+            if self.table_exists(table.name):
+                continue
+            self.new_tables[table.name] = table
+            if self.dry_run:
+                self.out(str(CreateTable(table).compile(dialect=self.conn.dialect)).strip() + ";")
+                for index in table.indexes:
+                    self.out(str(CreateIndex(index).compile(dialect=self.conn.dialect)).strip() + ";")
+            else:
+                table.create(self.conn)
+
+
+def applied_versions(conn):
+    if not inspect(conn).has_table(schema_version.name):
+        return set()
+    return set(conn.execute(select(schema_version.c.version)).scalars())
+
+
+def migrate(engine, dry_run=False, target=None, out=print):
+    """Apply pending migrations up to `target` (default: all). Returns the versions applied."""
+    with engine.begin() as conn:
+        op = Operations(conn, dry_run, out)
+        op.create_missing_tables(schema_version.metadata)
+        op.create_missing_tables(Base.metadata)
+        done = applied_versions(conn)
+    new_tables, planned_indexes = op.new_tables, op.planned_indexes
+
+    pending = [m for m in load_migrations()
+               if m.version not in done and (target is None or m.version <= target)]
+    for migration in pending:
+        out(f"-- {migration.name}: {migration.description}")
+        # MySQL commits DDL implicitly, so each migration gets its own transaction
+        # and is recorded only once its statements have all succeeded
+        with engine.begin() as conn:
+            migration.upgrade(Operations(conn, dry_run, out, new_tables, planned_indexes))
+            if not dry_run:
+                conn.execute(insert(schema_version).values(
+                    version=migration.version,
+                    description=migration.description,
+                    applied_at=datetime.utcnow(),
+                ))
+    return [m.version for m in pending]
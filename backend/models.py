@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey, Table, Integer, String, Text, DateTime, Column
+from sqlalchemy import ForeignKey, Table, Integer, String, Text, DateTime, Column, Index, CHAR
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from datetime import datetime
 
@@ -11,7 +11,9 @@ note_tags = Table(
     'note_tags',
     Base.metadata,
     Column('note_id', Integer, ForeignKey('note.id'), primary_key=True),
-    Column('tag_id', Integer, ForeignKey('tag.id'), primary_key=True)
+    Column('tag_id', Integer, ForeignKey('tag.id'), primary_key=True),
+    # Tag-filtered listings look notes up by tag; the PK only serves note -> tags
+    Index('ix_note_tags_tag_note', 'tag_id', 'note_id')
 )
 
 class User(Base):
@@ -53,6 +55,19 @@ class Note(Base):
     user: Mapped["User"] = relationship("User", back_populates="notes")
     tags: Mapped[list["Tag"]] = relationship("Tag", secondary=note_tags, back_populates="notes")
 
+    __table_args__ = (
+        # Keyset pagination / ?sort= for active and archived listings, one per sort column
+        Index("ix_note_user_scope_created", "user_id", "is_deleted", "is_archived", "created_at", "id"),
+        Index("ix_note_user_scope_updated", "user_id", "is_deleted", "is_archived", "updated_at", "id"),
+        Index("ix_note_user_scope_title", "user_id", "is_deleted", "is_archived", "title", "id"),
+        # The trash spans both archived states, so it gets its own (default-order) index
+        Index("ix_note_user_trash_updated", "user_id", "is_deleted", "updated_at", "id"),
+        # GET /sync: everything changed after a (updated_at, id) position
+        Index("ix_note_user_updated", "user_id", "updated_at", "id"),
+        # GET /notes/search (MATCH ... AGAINST); plain index elsewhere, unused there
+        Index("ft_note_title_content", "title", "content", mysql_prefix="FULLTEXT"),
+    )
+
     def to_dict(self):
         """Converts Note object to a dictionary for API response."""
         return {
@@ -75,9 +90,17 @@ class Tag(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey('user.id'), nullable=False)
     name: Mapped[str] = mapped_column(String(50), nullable=False)
+    # NULL for tags created before change tracking; only used by GET /sync
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
     user : Mapped["User"] = relationship("User", back_populates="tags")
     notes: Mapped[list["Note"]] = relationship("Note", secondary=note_tags, back_populates="tags")
 
+    __table_args__ = (
+        Index("ix_tag_user_updated", "user_id", "updated_at"),
+        # One tag per name and user; tag creation relies on it instead of checking first
+        Index("ux_tag_user_name", "user_id", "name", unique=True),
+    )
+
     def to_dict(self):
         
         return {
@@ -90,5 +113,55 @@ class RevokedToken(Base):
     __tablename__ = "revoked_token"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    token: Mapped[str] = mapped_column(String(500), unique=True, nullable=False)
-    revoked_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    # `jti` claim of the revoked JWT (see utils.token_jti), not the token itself
+    jti: Mapped[str] = mapped_column(CHAR(32), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    revoked_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ux_revoked_token_jti", "jti", unique=True),
+        # purge_revoked_tokens deletes by expiry
+        Index("ix_revoked_token_expires_at", "expires_at"),
+    )
+
+
+class Tombstone(Base):
+    """Marker left behind by a permanent delete so GET /sync can report it."""
+    __tablename__ = "tombstone"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey('user.id'), nullable=False)
+    entity: Mapped[str] = mapped_column(String(10), nullable=False)  # "note" | "tag"
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_tombstone_user_deleted", "user_id", "deleted_at"),
+    )
+
+
+class UserDataVersion(Base):
+    """Per-user counter bumped by every note/tag write; backs ETag / Last-Modified."""
+    __tablename__ = "user_data_version"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey('user.id'), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    changed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class TagNoteCount(Base):
+    """
+    Per-tag note counts by state for GET /tags?with_counts=1. Only maintained while
+    TAG_COUNTS_TABLE is on (see tag_counts.py); otherwise counts are aggregated live.
+    """
+    __tablename__ = "tag_note_count"
+
+    tag_id: Mapped[int] = mapped_column(ForeignKey('tag.id'), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey('user.id'), nullable=False)
+    active: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    archived: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    trashed: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        Index("ix_tag_note_count_user", "user_id"),
+    )
@@ -1,18 +1,207 @@
 # backend/notes.py
 
 from flask import Blueprint, request, jsonify
-from sqlalchemy import select, or_, desc, asc
-from sqlalchemy.orm import joinedload 
+from sqlalchemy import select, or_, desc, asc, case, literal, func, update, delete, insert
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import joinedload, selectinload
 from datetime import datetime, timedelta
 
 # Import essentials from the main package and the authentication helper
-from .database import get_db
-from .models import Note, Tag
+from .database import get_db, insert_ignore
+from .models import Note, Tag, note_tags
 from .auth import authenticate # Import the helper from the new auth file
+from .versioning import bump_data_version, conditional_get, add_validators
+from .sync import record_tombstones
+from .tag_counts import note_bucket, record_links, record_note_moves
+from .pagination import (
+    PaginationError, parse_limit, encode_cursor, decode_cursor, decode_offset_cursor, keyset_after
+)
 
 
 
 notes_bp = Blueprint('notes', __name__)
+notes_bp.after_request(add_validators)
+
+
+class ListingParamError(ValueError):
+    """Raised when a listing filter query parameter is invalid."""
+
+
+# -----------------------------
+# Helper: tag filter for listings
+# -----------------------------
+def _tag_filter():
+    """
+    Build the filter for `?tag_ids=1,2&match=any|all` as a semijoin on note_tags
+    (served by ix_note_tags_tag_note). Returns [] when no tags were requested.
+    """
+    raw_ids = [part for value in request.args.getlist("tag_ids") for part in value.split(",") if part.strip()]
+    if not raw_ids:
+        return []
+    try:
+        tag_ids = sorted({int(part) for part in raw_ids})
+    except ValueError:
+        raise ListingParamError("tag_ids must be a comma-separated list of integers")
+
+    match_mode = request.args.get("match", "any")
+    if match_mode not in ("any", "all"):
+        raise ListingParamError("match must be 'any' or 'all'")
+
+    tagged = select(note_tags.c.note_id).where(note_tags.c.tag_id.in_(tag_ids))
+    if match_mode == "all":
+        tagged = tagged.group_by(note_tags.c.note_id).having(func.count() == len(tag_ids))
+    return [Note.id.in_(tagged)]
+
+
+SORT_COLUMNS = {
+    "created_at": Note.created_at,
+    "updated_at": Note.updated_at,
+    "title": Note.title,
+}
+
+
+# -----------------------------
+# Helper: sort order for listings
+# -----------------------------
+def _sort_order(default_sort):
+    """
+    Read `?sort=created_at|updated_at|title&order=asc|desc`.
+    Returns (sort name, order, descending flag). Titles default to A-Z, dates to newest first.
+    """
+    sort = request.args.get("sort", default_sort)
+    if sort not in SORT_COLUMNS:
+        raise ListingParamError(f"sort must be one of: {', '.join(SORT_COLUMNS)}")
+
+    order = request.args.get("order", "asc" if sort == "title" else "desc")
+    if order not in ("asc", "desc"):
+        raise ListingParamError("order must be 'asc' or 'desc'")
+    return sort, order, order == "desc"
+
+
+# -----------------------------
+# Helper: Core row projections
+# -----------------------------
+PREVIEW_LENGTH = 200
+TAG_LOOKUP_CHUNK = 500
+
+# Same fields as Note.to_dict(), read as plain rows without building ORM objects
+NOTE_COLUMNS = (
+    Note.id,
+    Note.title,
+    Note.content,
+    Note.user_id,
+    Note.created_at,
+    Note.updated_at,
+    Note.is_archived,
+    Note.is_deleted,
+)
+
+SUMMARY_COLUMNS = (
+    Note.id,
+    Note.title,
+    func.substr(Note.content, 1, PREVIEW_LENGTH).label("preview"),  # truncated in SQL
+    Note.user_id,
+    Note.created_at,
+    Note.updated_at,
+    Note.is_archived,
+    Note.is_deleted,
+)
+
+
+def _tags_by_note(db, note_ids):
+    """Map note id -> [tag dict] with one query per chunk of ids, reading only tag columns."""
+    tags = {note_id: [] for note_id in note_ids}
+    for start in range(0, len(note_ids), TAG_LOOKUP_CHUNK):
+        chunk = note_ids[start:start + TAG_LOOKUP_CHUNK]
+        rows = db.execute(
+            select(note_tags.c.note_id, Tag.id, Tag.name)
+            .join(Tag, Tag.id == note_tags.c.tag_id)
+            .where(note_tags.c.note_id.in_(chunk))
+        ).all()
+        for note_id, tag_id, name in rows:
+            tags[note_id].append({"id": tag_id, "name": name})
+    return tags
+
+
+# Timestamps stay datetime objects: the app's JSON provider encodes them as ISO 8601,
+# in C when orjson is installed, instead of an isoformat() call per value here.
+def _note_dict(row, tags):
+    """Serialize a NOTE_COLUMNS row in the shape of Note.to_dict()."""
+    return {
+        "id": row.id,
+        "title": row.title,
+        "content": row.content,
+        "user_id": row.user_id,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+        "is_archived": row.is_archived,
+        "is_deleted": row.is_deleted,
+        "tags": tags,
+    }
+
+
+def _summary_dict(row, tags):
+    return {
+        "id": row.id,
+        "title": row.title,
+        "preview": row.preview or "",
+        "user_id": row.user_id,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+        "is_archived": row.is_archived,
+        "is_deleted": row.is_deleted,
+        "tags": tags,
+    }
+
+
+def _listing_view():
+    view = request.args.get("view", "full")
+    if view not in ("full", "summary"):
+        raise ListingParamError("view must be 'full' or 'summary'")
+    return view
+
+
+# -----------------------------
+# Helper: keyset-paginated listing
+# -----------------------------
+def _list_notes(db, filters, default_sort="created_at"):
+    """
+    Return (serialized notes, next_cursor) for a listing ordered by the requested sort
+    column, then id. Pagination kicks in when the client sends `limit` or `cursor`;
+    without them the whole collection is returned as before and next_cursor is None.
+    Both views read Core rows and attach tags with one query per chunk of ids;
+    `?view=summary` swaps the content for a preview truncated in SQL.
+    """
+    sort, order, descending = _sort_order(default_sort)
+    summary = _listing_view() == "summary"
+    order_columns = [SORT_COLUMNS[sort], Note.id]
+    direction = desc if descending else asc
+
+    stmt = select(*(SUMMARY_COLUMNS if summary else NOTE_COLUMNS))
+    stmt = stmt.where(*filters).order_by(*[direction(c) for c in order_columns])
+
+    paginate = "limit" in request.args or "cursor" in request.args
+    next_cursor = None
+    if paginate:
+        limit = parse_limit(request.args.get("limit"))
+        cursor = request.args.get("cursor")
+        cursor_key = f"{sort}:{order}"
+        if cursor:
+            after = decode_cursor(cursor, order_columns, key=cursor_key)
+            stmt = stmt.where(keyset_after(order_columns, after, descending))
+        # Fetch one extra row to know whether another page exists
+        stmt = stmt.limit(limit + 1)
+
+    rows = db.execute(stmt).all()
+
+    if paginate and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], c.key) for c in order_columns], key=cursor_key)
+
+    tags = _tags_by_note(db, [row.id for row in rows])
+    serialize = _summary_dict if summary else _note_dict
+    return [serialize(row, tags[row.id]) for row in rows], next_cursor
+
 
 @notes_bp.route('/notes', methods=["POST"])
 def create_note():
@@ -28,19 +217,26 @@ def create_note():
     if not title:
         return jsonify({"error": "Title is required"}), 400
 
-    with next(get_db()) as db:
-        note = Note(title=title, content=content, user_id=user_id)
+    if not isinstance(tag_ids, list) or any(type(i) is not int for i in tag_ids):
+        return jsonify({"error": "tag_ids must be a list of integers"}), 400
 
-        # Add tags if provided
-        if tag_ids:
-            stmt = select(Tag).where(Tag.id.in_(tag_ids), Tag.user_id == user_id)
-            tags = db.execute(stmt).scalars().all()
-            note.tags = tags
+    with next(get_db()) as db:
+        # Unknown or foreign ids are dropped, as before
+        tags = _lock_user_tags(db, user_id, tag_ids)
 
+        # An initialised (empty) collection keeps to_dict() from lazy-loading tags
+        note = Note(title=title, content=content, user_id=user_id, tags=[])
         db.add(note)
+        db.flush()
+        if tags:
+            db.execute(insert(note_tags), [{"note_id": note.id, "tag_id": i} for i in tags])
+            record_links(db, user_id, [(i, "active", 1) for i in tags])
+        bump_data_version(db, user_id)
         db.commit()
 
-        return jsonify({"message": "Note created", "note": note.to_dict()}), 201
+        note_data = note.to_dict()
+        note_data["tags"] = [{"id": i, "name": name} for i, name in tags.items()]
+        return jsonify({"message": "Note created", "note": note_data}), 201
 
 # archivedNotes = notes.filter(note => note.is_archived)
 @notes_bp.route('/notes', methods=['GET'])
@@ -51,19 +247,21 @@ def get_notes():
 
     try:
         with next(get_db()) as db:
-            stmt = (
-                select(Note)
-                .where(Note.user_id == user_id, Note.is_archived == False, Note.is_deleted == False)
-                .options(joinedload(Note.tags))  # eager-load tags
-                .order_by(desc(Note.created_at))
+            not_modified = conditional_get(db, user_id)
+            if not_modified:
+                return not_modified
+            notes, next_cursor = _list_notes(
+                db,
+                [Note.user_id == user_id, Note.is_archived == False, Note.is_deleted == False, *_tag_filter()],
             )
-            
-            notes = db.execute(stmt).unique().scalars().all()
 
             return jsonify({
                 "success": True,
-                "notes": [n.to_dict() for n in notes]
+                "notes": notes,
+                "next_cursor": next_cursor
             }), 200
+    except (PaginationError, ListingParamError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -81,33 +279,244 @@ def get_archived_notes():
 
     try:
         with next(get_db()) as db:
+            not_modified = conditional_get(db, user_id)
+            if not_modified:
+                return not_modified
+            notes, next_cursor = _list_notes(
+                db,
+                [Note.user_id == user_id, Note.is_archived == True, Note.is_deleted == False, *_tag_filter()],
+            )
+
+            return jsonify({
+                "success": True,
+                "notes": notes,
+                "next_cursor": next_cursor
+            }), 200
+    except (PaginationError, ListingParamError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": "Failed to fetch archived notes",
+            "details": str(e)
+        }), 500
+
+
+SEARCH_SCOPES = {
+    "active": lambda: [Note.is_archived == False, Note.is_deleted == False],
+    "archived": lambda: [Note.is_archived == True, Note.is_deleted == False],
+    "trash": lambda: [Note.is_deleted == True],
+    "all": lambda: [],
+}
+SNIPPET_RADIUS = 60
+
+
+def _snippet(text, query):
+    """Cut a short excerpt of `text` around the first query term it contains."""
+    if not text:
+        return ""
+    lowered = text.lower()
+    positions = [lowered.find(term) for term in query.lower().split()]
+    hits = [p for p in positions if p >= 0]
+    start = max(min(hits) - SNIPPET_RADIUS, 0) if hits else 0
+    end = start + 2 * SNIPPET_RADIUS
+    snippet = text[start:end].strip()
+    if start > 0:
+        snippet = "…" + snippet
+    if end < len(text):
+        snippet += "…"
+    return snippet
+
+
+@notes_bp.route('/notes/search', methods=['GET'])
+def search_notes():
+    """Full-text search over the user's note titles and contents, best matches first."""
+    user_id = authenticate()
+    if isinstance(user_id, tuple):
+        return user_id
+
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"success": False, "error": "Search query 'q' is required"}), 400
+
+    scope = request.args.get("scope", "active")
+    if scope not in SEARCH_SCOPES:
+        return jsonify({
+            "success": False,
+            "error": f"scope must be one of: {', '.join(SEARCH_SCOPES)}"
+        }), 400
+
+    try:
+        limit = parse_limit(request.args.get("limit"))
+        offset = decode_offset_cursor(request.args.get("cursor"))
+
+        with next(get_db()) as db:
+            not_modified = conditional_get(db, user_id)
+            if not_modified:
+                return not_modified
+            if db.get_bind().dialect.name == "mysql":
+                # Served by the ft_note_title_content FULLTEXT index
+                score = match(Note.title, Note.content, against=query)
+                condition = score > 0
+            else:
+                # Fallback for non-MySQL backends (e.g. a local SQLite database)
+                condition = or_(Note.title.icontains(query, autoescape=True),
+                                Note.content.icontains(query, autoescape=True))
+                score = case((Note.title.icontains(query, autoescape=True), literal(2.0)), else_=literal(1.0))
+            score = score.label("score")
+
             stmt = (
-                select(Note)
-                .where(Note.user_id == user_id, Note.is_archived == True, Note.is_deleted == False)
-                .options(joinedload(Note.tags))
-                .order_by(desc(Note.created_at))
+                select(Note, score)
+                .where(Note.user_id == user_id, condition, *SEARCH_SCOPES[scope]())
+                .options(selectinload(Note.tags))
+                .order_by(desc(score), desc(Note.id))
+                .offset(offset)
+                .limit(limit + 1)
             )
+            rows = db.execute(stmt).all()
+
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor([offset + limit])
 
-            notes = db.execute(stmt).unique().scalars().all()
+            results = []
+            for note, note_score in rows:
+                data = note.to_dict()
+                data["snippet"] = _snippet(data.pop("content"), query)
+                data["score"] = float(note_score)
+                results.append(data)
 
             return jsonify({
                 "success": True,
-                "notes": [n.to_dict() for n in notes]
+                "notes": results,
+                "next_cursor": next_cursor
             }), 200
+    except PaginationError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({
             "success": False,
-            "error": "Failed to fetch archived notes",
+            "error": "Failed to search notes",
             "details": str(e)
         }), 500
 
 
+# -----------------------------
+# Helper: load a single note for a write
+# -----------------------------
+def _get_user_note(db, note_id, user_id, for_update=False):
+    """
+    Fetch one of the user's notes with its tags loaded up front, so the
+    to_dict() after commit (or the association cleanup on delete) does not
+    lazy-load them with an extra query. `for_update` locks the note row until
+    commit, serializing concurrent tag changes and state moves on it, so the
+    tag count bucket read from the row stays right until the counts are written.
+    """
+    stmt = (
+        select(Note)
+        .where(Note.id == note_id, Note.user_id == user_id)
+        .options(selectinload(Note.tags))
+    )
+    if for_update:
+        stmt = stmt.with_for_update(of=Note)
+    return db.execute(stmt).scalars().first()
+
+
+def _lock_user_tags(db, user_id, tag_ids):
+    """
+    Map id -> name (ordered by name) for the ids in `tag_ids` that belong to the
+    user, share-locking those tag rows until commit. A concurrent tag delete then
+    waits for this transaction's note_tags writes instead of racing them: on MySQL
+    INSERT IGNORE would turn the foreign key violation into a silently skipped row.
+    """
+    if not tag_ids:
+        return {}
+    return dict(db.execute(
+        select(Tag.id, Tag.name)
+        .where(Tag.user_id == user_id, Tag.id.in_(set(tag_ids)))
+        .order_by(Tag.name)
+        .with_for_update(read=True)
+    ).all())
+
+
+def _owned_note_and_tag(db, note_id, tag_id, user_id):
+    """
+    Check ownership of both ids without loading either entity. The note row is
+    locked like _get_user_note(for_update=True), so its state (the tag count
+    bucket) cannot move before commit; the tag row is share-locked (see
+    _lock_user_tags). Returns (note state row or None, tag name or None).
+    """
+    note = db.execute(
+        select(Note.id, Note.is_archived, Note.is_deleted)
+        .where(Note.id == note_id, Note.user_id == user_id)
+        .with_for_update()
+    ).first()
+    tag_name = _lock_user_tags(db, user_id, [tag_id]).get(tag_id) if type(tag_id) is int else None
+    return note, tag_name
+
+
+def _touch_note(db, note_id):
+    db.execute(update(Note).where(Note.id == note_id).values(updated_at=datetime.utcnow()))
+
+
+def _set_note_state(db, user_id, note, **state):
+    """Apply is_archived / is_deleted changes to a loaded note, keeping tag counts in step."""
+    old_bucket = note_bucket(note.is_archived, note.is_deleted)
+    for column, value in state.items():
+        setattr(note, column, value)
+    note.updated_at = datetime.utcnow()
+    new_bucket = note_bucket(note.is_archived, note.is_deleted)
+    if new_bucket != old_bucket:
+        record_links(db, user_id, [
+            link for tag in note.tags for link in ((tag.id, old_bucket, -1), (tag.id, new_bucket, 1))
+        ])
+
+
+def _is_id_list(value):
+    return isinstance(value, list) and all(type(i) is int for i in value)
+
+
+def _replace_note_tags(db, user_id, note_id, bucket, tag_ids):
+    """
+    Make the note's tags exactly `tag_ids` (already checked to be the user's) with
+    at most one bulk delete and one bulk insert. Only the difference against the
+    current note_tags rows is written. Returns (added ids, removed ids), or None if
+    a write hit fewer rows than the read promised (a concurrent tag delete, say),
+    in which case the caller must roll back and redo it from a fresh read.
+    """
+    wanted = set(tag_ids)
+    current = set(db.execute(
+        select(note_tags.c.tag_id).where(note_tags.c.note_id == note_id)
+    ).scalars())
+    added = [i for i in dict.fromkeys(tag_ids) if i not in current]
+    removed = sorted(current - wanted)
+
+    if removed:
+        deleted = db.execute(
+            delete(note_tags).where(note_tags.c.note_id == note_id, note_tags.c.tag_id.in_(removed))
+        ).rowcount
+        if deleted != len(removed):
+            return None
+    if added:
+        # Rows written concurrently are skipped rather than failing the batch; the
+        # count check below catches them before any tag count is recorded
+        inserted = db.execute(insert_ignore(db, note_tags), [{"note_id": note_id, "tag_id": i} for i in added]).rowcount
+        if inserted != len(added):
+            return None
+    record_links(db, user_id, [(i, bucket, 1) for i in added] + [(i, bucket, -1) for i in removed])
+    return added, removed
+
+
 @notes_bp.route('/notes/<int:note_id>', methods=['GET'])
 def get_note(note_id):
     user_id = authenticate()
     if isinstance(user_id, tuple): return user_id
 
     with next(get_db()) as db:
+        not_modified = conditional_get(db, user_id)
+        if not_modified:
+            return not_modified
         stmt = (
             select(Note)
             .where(Note.id == note_id, Note.user_id == user_id)
@@ -134,27 +543,53 @@ def update_note(note_id):
     data = request.get_json()
     title = data.get('title')
     content = data.get('content')
+    tag_ids = data.get('tag_ids')  # optional: replaces the note's tags, like PUT /notes/<id>/tags
+
+    if tag_ids is not None and not _is_id_list(tag_ids):
+        return jsonify({"error": "tag_ids must be a list of integers"}), 400
 
     with next(get_db()) as db:
-        
-        stmt = select(Note).where(Note.id == note_id, Note.user_id == user_id)
-        note = db.execute(stmt).scalars().first()
+        for attempt in range(2):
+            if attempt:
+                # Another request changed the note's tags after the read; it has
+                # committed by now, so a fresh read sees it
+                db.rollback()
 
-        if not note:
-            return jsonify({"error": "Note not found"}), 404
+            note = _get_user_note(db, note_id, user_id, for_update=tag_ids is not None)
 
-        
-        if title:
-            note.title = title
-        if content is not None:
-            note.content = content
+            if not note:
+                return jsonify({"error": "Note not found"}), 404
+
+            tags = None
+            if tag_ids is not None:
+                tags = _lock_user_tags(db, user_id, tag_ids)
+                missing = [i for i in dict.fromkeys(tag_ids) if i not in tags]
+                if missing:
+                    return jsonify({"error": "Tag not found", "tag_ids": missing}), 404
 
-       
-        note.updated_at = datetime.utcnow()
+            if title:
+                note.title = title
+            if content is not None:
+                note.content = content
 
+            note.updated_at = datetime.utcnow()
+
+            if tags is None:
+                break
+            bucket = note_bucket(note.is_archived, note.is_deleted)
+            if _replace_note_tags(db, user_id, note.id, bucket, tag_ids) is not None:
+                break
+        else:
+            db.rollback()
+            return jsonify({"error": "Note changed concurrently, retry"}), 409
+        bump_data_version(db, user_id)
         db.commit()
 
-        return jsonify({"message": "Note updated", "note": note.to_dict()}), 200
+        note_data = note.to_dict()
+        if tags is not None:
+            # The loaded tags collection predates the Core writes to note_tags
+            note_data["tags"] = [{"id": i, "name": tags[i]} for i in dict.fromkeys(tag_ids)]
+        return jsonify({"message": "Note updated", "note": note_data}), 200
 
 
 @notes_bp.route('/notes/<int:note_id>/archive', methods=['PUT'])
@@ -166,8 +601,7 @@ def archive_note(note_id):
 
     try:
         with next(get_db()) as db:
-            stmt = select(Note).where(Note.id == note_id, Note.user_id == user_id)
-            note = db.execute(stmt).scalars().first()
+            note = _get_user_note(db, note_id, user_id, for_update=True)
 
             if not note:
                 return jsonify({"success": False, "error": "Note not found"}), 404
@@ -178,8 +612,8 @@ def archive_note(note_id):
                     "error": "Note is already archived"
                 }), 400
 
-            note.is_archived = True
-            note.updated_at = datetime.utcnow()
+            _set_note_state(db, user_id, note, is_archived=True)
+            bump_data_version(db, user_id)
             db.commit()
 
             return jsonify({
@@ -204,8 +638,7 @@ def unarchive_note(note_id):
 
     try:
         with next(get_db()) as db:
-            stmt = select(Note).where(Note.id == note_id, Note.user_id == user_id)
-            note = db.execute(stmt).scalars().first()
+            note = _get_user_note(db, note_id, user_id, for_update=True)
 
             if not note:
                 return jsonify({"success": False, "error": "Note not found"}), 404
@@ -216,8 +649,8 @@ def unarchive_note(note_id):
                     "error": "Note is already active"
                 }), 400
 
-            note.is_archived = False
-            note.updated_at = datetime.utcnow()
+            _set_note_state(db, user_id, note, is_archived=False)
+            bump_data_version(db, user_id)
             db.commit()
 
             return jsonify({
@@ -241,8 +674,7 @@ def delete_note(note_id):
 
     try:
         with next(get_db()) as db:
-            stmt = select(Note).where(Note.id == note_id, Note.user_id == user_id)
-            note = db.execute(stmt).scalars().first()
+            note = _get_user_note(db, note_id, user_id, for_update=True)
 
             if not note:
                 return jsonify({"success": False, "error": "Note not found"}), 404
@@ -253,8 +685,8 @@ def delete_note(note_id):
                     "error": "Note is already in trash"
                 }), 400
 
-            note.is_deleted = True
-            note.updated_at = datetime.utcnow()
+            _set_note_state(db, user_id, note, is_deleted=True)
+            bump_data_version(db, user_id)
             db.commit()
 
             return jsonify({
@@ -288,32 +720,27 @@ def add_tag_to_note(note_id):
         return jsonify({"error": "tag_id is required"}), 400
 
     with next(get_db()) as db:
-        # Get note
-        note = db.execute(
-            select(Note).where(Note.id == note_id, Note.user_id == user_id)
-        ).scalars().first()
-
+        note, tag_name = _owned_note_and_tag(db, note_id, tag_id, user_id)
         if not note:
             return jsonify({"error": "Note not found"}), 404
-
-        # Get tag
-        tag = db.execute(
-            select(Tag).where(Tag.id == tag_id, Tag.user_id == user_id)
-        ).scalars().first()
-
-        if not tag:
+        if tag_name is None:
             return jsonify({"error": "Tag not found"}), 404
 
-        # Avoid duplicate
-        if tag in note.tags:
+        # The primary key on note_tags does the duplicate check in the same statement
+        inserted = db.execute(
+            insert_ignore(db, note_tags).values(note_id=note_id, tag_id=tag_id)
+        ).rowcount
+        if not inserted:
             return jsonify({"error": "Tag already attached"}), 400
 
-        note.tags.append(tag)
+        record_links(db, user_id, [(tag_id, note_bucket(note.is_archived, note.is_deleted), 1)])
+        _touch_note(db, note_id)
+        bump_data_version(db, user_id)
         db.commit()
 
         return jsonify({
             "message": "Tag attached to note",
-            "tag": tag.to_dict()
+            "tag": {"id": tag_id, "name": tag_name}
         }), 200
 
 @notes_bp.route("/notes/<int:note_id>/tags/<int:tag_id>", methods=["DELETE"])
@@ -323,27 +750,81 @@ def remove_tag_from_note(note_id, tag_id):
         return user_id
 
     with next(get_db()) as db:
-        note = db.execute(
-            select(Note).where(Note.id == note_id, Note.user_id == user_id)
-        ).scalars().first()
+        note, tag_name = _owned_note_and_tag(db, note_id, tag_id, user_id)
         if not note:
             return jsonify({"error": "Note not found"}), 404
-
-        tag = db.execute(
-            select(Tag).where(Tag.id == tag_id, Tag.user_id == user_id)
-        ).scalars().first()
-        if not tag:
+        if tag_name is None:
             return jsonify({"error": "Tag not found"}), 404
 
-        if tag not in note.tags:
+        removed = db.execute(
+            delete(note_tags).where(note_tags.c.note_id == note_id, note_tags.c.tag_id == tag_id)
+        ).rowcount
+        if not removed:
             return jsonify({"error": "Tag not attached to this note"}), 400
 
-        note.tags.remove(tag)
+        record_links(db, user_id, [(tag_id, note_bucket(note.is_archived, note.is_deleted), -1)])
+        _touch_note(db, note_id)
+        bump_data_version(db, user_id)
         db.commit()
 
         return jsonify({"message": "Tag detached from note"}), 200
 
 
+@notes_bp.route("/notes/<int:note_id>/tags", methods=["PUT"])
+def replace_note_tags(note_id):
+    """
+    Set the note's tags to exactly the given set: {"tag_ids": [1, 2]}; [] clears them.
+    Only the difference is written, in one transaction.
+    """
+    user_id = authenticate()
+    if isinstance(user_id, tuple):
+        return user_id
+
+    tag_ids = (request.get_json(silent=True) or {}).get("tag_ids")
+    if not _is_id_list(tag_ids):
+        return jsonify({"error": "tag_ids must be a list of integers"}), 400
+
+    with next(get_db()) as db:
+        for attempt in range(2):
+            if attempt:
+                # Another request changed the note's tags after the read; it has
+                # committed by now, so a fresh read sees it
+                db.rollback()
+
+            note = db.execute(
+                select(Note.id, Note.is_archived, Note.is_deleted)
+                .where(Note.id == note_id, Note.user_id == user_id)
+                .with_for_update()
+            ).first()
+            if not note:
+                return jsonify({"error": "Note not found"}), 404
+
+            tags = _lock_user_tags(db, user_id, tag_ids)
+            missing = [i for i in dict.fromkeys(tag_ids) if i not in tags]
+            if missing:
+                return jsonify({"error": "Tag not found", "tag_ids": missing}), 404
+
+            diff = _replace_note_tags(db, user_id, note_id, note_bucket(note.is_archived, note.is_deleted), tag_ids)
+            if diff is not None:
+                break
+        else:
+            db.rollback()
+            return jsonify({"error": "Note changed concurrently, retry"}), 409
+
+        added, removed = diff
+        if added or removed:
+            _touch_note(db, note_id)
+            bump_data_version(db, user_id)
+        db.commit()
+
+        return jsonify({
+            "message": "Note tags updated",
+            "tags": [{"id": i, "name": tags[i]} for i in dict.fromkeys(tag_ids)],
+            "added": added,
+            "removed": removed,
+        }), 200
+
+
 @notes_bp.route('/notes/trash', methods=['GET'])
 def get_trash_notes():
     """Return all deleted notes (in trash) for the authenticated user."""
@@ -353,19 +834,22 @@ def get_trash_notes():
 
     try:
         with next(get_db()) as db:
-            stmt = (
-                select(Note)
-                .where(Note.user_id == user_id, Note.is_deleted == True)
-                .options(joinedload(Note.tags))
-                .order_by(desc(Note.updated_at))
+            not_modified = conditional_get(db, user_id)
+            if not_modified:
+                return not_modified
+            notes, next_cursor = _list_notes(
+                db,
+                [Note.user_id == user_id, Note.is_deleted == True],
+                default_sort="updated_at",
             )
 
-            notes = db.execute(stmt).unique().scalars().all()
-
             return jsonify({
                 "success": True,
-                "notes": [n.to_dict() for n in notes]
+                "notes": notes,
+                "next_cursor": next_cursor
             }), 200
+    except (PaginationError, ListingParamError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -383,8 +867,7 @@ def recover_note(note_id):
 
     try:
         with next(get_db()) as db:
-            stmt = select(Note).where(Note.id == note_id, Note.user_id == user_id)
-            note = db.execute(stmt).scalars().first()
+            note = _get_user_note(db, note_id, user_id, for_update=True)
 
             if not note:
                 return jsonify({"success": False, "error": "Note not found"}), 404
@@ -395,8 +878,8 @@ def recover_note(note_id):
                     "error": "Note is not in trash"
                 }), 400
 
-            note.is_deleted = False
-            note.updated_at = datetime.utcnow()
+            _set_note_state(db, user_id, note, is_deleted=False)
+            bump_data_version(db, user_id)
             db.commit()
 
             return jsonify({
@@ -421,8 +904,7 @@ def delete_note_permanent(note_id):
 
     try:
         with next(get_db()) as db:
-            stmt = select(Note).where(Note.id == note_id, Note.user_id == user_id)
-            note = db.execute(stmt).scalars().first()
+            note = _get_user_note(db, note_id, user_id, for_update=True)
 
             if not note:
                 return jsonify({"success": False, "error": "Note not found"}), 404
@@ -433,7 +915,10 @@ def delete_note_permanent(note_id):
                     "error": "Note must be in trash before permanent deletion"
                 }), 400
 
+            record_links(db, user_id, [(tag.id, "trashed", -1) for tag in note.tags])
             db.delete(note)
+            record_tombstones(db, user_id, "note", [note_id])
+            bump_data_version(db, user_id)
             db.commit()
 
             return jsonify({
@@ -447,5 +932,162 @@ def delete_note_permanent(note_id):
             "details": str(e)
         }), 500
 
-        
 
+# -----------------------------
+# Bulk operations
+# -----------------------------
+BULK_MAX_IDS = 1000
+
+# action -> (precondition on the current row, error when it fails, column values to set)
+BULK_STATE_ACTIONS = {
+    "archive": (lambda n: not n.is_archived, "Note is already archived", {"is_archived": True}),
+    "unarchive": (lambda n: n.is_archived, "Note is already active", {"is_archived": False}),
+    "trash": (lambda n: not n.is_deleted, "Note is already in trash", {"is_deleted": True}),
+    "recover": (lambda n: n.is_deleted, "Note is not in trash", {"is_deleted": False}),
+    "purge": (lambda n: n.is_deleted, "Note must be in trash before permanent deletion", None),
+}
+BULK_ACTIONS = [*BULK_STATE_ACTIONS, "tag"]
+
+
+def _lock_bulk_notes(db, user_id, ids):
+    """Lock the user's notes among `ids`; returns (id -> state row, id -> error for the rest)."""
+    rows = db.execute(
+        select(Note.id, Note.is_archived, Note.is_deleted)
+        .where(Note.user_id == user_id, Note.id.in_(ids))
+        .with_for_update()
+    ).all()
+    found = {row.id: row for row in rows}
+    return found, {i: "Note not found" for i in ids if i not in found}
+
+
+def _bulk_attach(db, user_id, found, tag_id):
+    """
+    Attach `tag_id` to the locked notes in `found` that lack it. Returns (ids tagged,
+    ids already tagged), or None if the insert skipped rows that a concurrent attach
+    added after the read, in which case the caller must roll back.
+    """
+    attached = set(db.execute(
+        select(note_tags.c.note_id)
+        .where(note_tags.c.tag_id == tag_id, note_tags.c.note_id.in_(list(found)))
+    ).scalars())
+    targets = [i for i in found if i not in attached]
+    if not targets:
+        return targets, attached
+
+    inserted = db.execute(insert_ignore(db, note_tags), [{"note_id": i, "tag_id": tag_id} for i in targets]).rowcount
+    if inserted != len(targets):
+        return None
+    record_links(db, user_id, [
+        (tag_id, note_bucket(found[i].is_archived, found[i].is_deleted), 1) for i in targets
+    ])
+    # Tag changes count as note updates (sync picks notes up by updated_at)
+    db.execute(
+        update(Note)
+        .where(Note.user_id == user_id, Note.id.in_(targets))
+        .values(updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return targets, attached
+
+
+@notes_bp.route('/notes/bulk', methods=['POST'])
+def bulk_notes():
+    """
+    Apply one action to many notes in a single transaction.
+    Body: {"action": "archive|unarchive|trash|recover|purge|tag", "ids": [...], "tag_id": 1 (tag only)}
+    """
+    user_id = authenticate()
+    if isinstance(user_id, tuple):
+        return user_id
+
+    data = request.get_json() or {}
+    action = data.get("action")
+    ids = data.get("ids")
+
+    if action not in BULK_ACTIONS:
+        return jsonify({"success": False, "error": f"action must be one of: {', '.join(BULK_ACTIONS)}"}), 400
+    if not isinstance(ids, list) or not ids or not all(type(i) is int for i in ids):
+        return jsonify({"success": False, "error": "ids must be a non-empty list of note ids"}), 400
+    if len(ids) > BULK_MAX_IDS:
+        return jsonify({"success": False, "error": f"At most {BULK_MAX_IDS} ids per request"}), 400
+    ids = list(dict.fromkeys(ids))
+
+    if action == "tag" and type(data.get("tag_id")) is not int:
+        return jsonify({"success": False, "error": "tag_id is required"}), 400
+
+    try:
+        with next(get_db()) as db:
+            # One locking read decides the outcome for every id; the rows stay locked until commit
+            found, errors = _lock_bulk_notes(db, user_id, ids)
+
+            if action == "tag":
+                tag_id = data["tag_id"]
+                for attempt in range(2):
+                    if attempt:
+                        # Another request wrote some of the rows after the read; it
+                        # has committed by now, so a fresh read (and tag check) sees it
+                        db.rollback()
+                        found, errors = _lock_bulk_notes(db, user_id, ids)
+                    if not _lock_user_tags(db, user_id, [tag_id]):
+                        db.rollback()
+                        return jsonify({"success": False, "error": "Tag not found"}), 404
+                    attach = _bulk_attach(db, user_id, found, tag_id)
+                    if attach is not None:
+                        break
+                else:
+                    db.rollback()
+                    return jsonify({"success": False, "error": "Notes changed concurrently, retry"}), 409
+                targets, attached = attach
+                errors.update({i: "Tag already attached" for i in attached})
+            else:
+                precondition, message, values = BULK_STATE_ACTIONS[action]
+                errors.update({i: message for i, row in found.items() if not precondition(row)})
+                targets = [i for i in found if i not in errors]
+                if targets:
+                    record_note_moves(db, user_id, {
+                        i: (
+                            note_bucket(found[i].is_archived, found[i].is_deleted),
+                            None if values is None else note_bucket(
+                                values.get("is_archived", found[i].is_archived),
+                                values.get("is_deleted", found[i].is_deleted),
+                            ),
+                        )
+                        for i in targets
+                    })
+                    if values is None:
+                        # Permanent delete: association rows first, then the notes themselves
+                        db.execute(delete(note_tags).where(note_tags.c.note_id.in_(targets)))
+                        db.execute(
+                            delete(Note)
+                            .where(Note.user_id == user_id, Note.id.in_(targets), Note.is_deleted == True)
+                            .execution_options(synchronize_session=False)
+                        )
+                        record_tombstones(db, user_id, "note", targets)
+                    else:
+                        db.execute(
+                            update(Note)
+                            .where(Note.user_id == user_id, Note.id.in_(targets))
+                            .values(**values, updated_at=datetime.utcnow())
+                            .execution_options(synchronize_session=False)
+                        )
+
+            if targets:
+                bump_data_version(db, user_id)
+            db.commit()
+
+            results = [
+                {"id": i, "success": False, "error": errors[i]} if i in errors else {"id": i, "success": True}
+                for i in ids
+            ]
+            return jsonify({
+                "success": True,
+                "action": action,
+                "affected": len(targets),
+                "results": results
+            }), 200
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": "Failed to apply bulk action",
+            "details": str(e)
+        }), 500
@@ -0,0 +1,103 @@
+# backend/pagination.py
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class PaginationError(ValueError):
+    """Raised when the client sends an invalid `limit` or `cursor`."""
+
+
+def parse_limit(raw, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Validate the `limit` query parameter, falling back to the default page size."""
+    if raw is None or raw == "":
+        return default
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        raise PaginationError("limit must be an integer")
+    if limit < 1 or limit > maximum:
+        raise PaginationError(f"limit must be between 1 and {maximum}")
+    return limit
+
+
+def encode_cursor(values, key=None):
+    """
+    Pack the sort key of the last row on a page into an opaque cursor string.
+    `key` names the ordering the values belong to, so a cursor cannot be
+    replayed against a listing sorted differently.
+    """
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    if key is not None:
+        payload.insert(0, key)
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _unpack(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise PaginationError("Invalid cursor")
+    if not isinstance(values, list):
+        raise PaginationError("Invalid cursor")
+    return values
+
+
+def decode_cursor(cursor, columns, key=None):
+    """Unpack a cursor produced by `encode_cursor` into values matching `columns`."""
+    values = _unpack(cursor)
+    if key is not None:
+        if not values or values[0] != key:
+            raise PaginationError("Cursor does not match the requested sort order")
+        values = values[1:]
+    if len(values) != len(columns):
+        raise PaginationError("Invalid cursor")
+
+    decoded = []
+    for column, value in zip(columns, values):
+        try:
+            if column.type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif not isinstance(value, column.type.python_type):
+                raise TypeError
+        except (TypeError, ValueError):
+            raise PaginationError("Invalid cursor")
+        decoded.append(value)
+    return decoded
+
+
+def decode_offset_cursor(cursor):
+    """
+    Unpack an offset cursor (`encode_cursor([offset])`). Used where the sort key
+    is not stable enough for keyset paging, e.g. full-text relevance scores.
+    """
+    if not cursor:
+        return 0
+    values = _unpack(cursor)
+    if len(values) != 1 or type(values[0]) is not int or values[0] < 0:
+        raise PaginationError("Invalid cursor")
+    return values[0]
+
+
+def keyset_after(columns, values, descending=True):
+    """
+    Build the WHERE clause selecting rows strictly after `values` in
+    (col1, col2, ...) order, e.g. `a < :a OR (a = :a AND b < :b)`.
+    Written out instead of a row-value comparison so every backend can use the index.
+    """
+    column, rest = columns[0], columns[1:]
+    value, rest_values = values[0], values[1:]
+    past = column < value if descending else column > value
+    if not rest:
+        return past
+    return or_(past, and_(column == value, keyset_after(rest, rest_values, descending)))
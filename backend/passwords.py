@@ -0,0 +1,79 @@
+# backend/passwords.py
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+
+# -----------------------------
+# Hashing config
+# -----------------------------
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+# bcrypt releases the GIL, so hashes on these threads really run in parallel
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+# Hashes running or queued before new ones are refused with 503
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", PASSWORD_HASH_WORKERS * 4))
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when the hashing pool already has PASSWORD_HASH_MAX_PENDING jobs."""
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+
+
+def _run(fn, *args):
+    """Run `fn` on the hashing pool and wait for it; refuse instead of queueing without bound."""
+    global _pool, _pool_pid
+
+    if not _slots.acquire(blocking=False):
+        raise PasswordHasherBusy("Too many password operations in progress")
+    try:
+        with _pool_lock:
+            # Created lazily per process so forked workers do not inherit a dead pool
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = _make_pool()
+                _pool_pid = os.getpid()
+        return _pool(fn, *args)
+    finally:
+        _slots.release()
+
+
+def _make_pool():
+    try:
+        from gevent import monkey
+        patched = monkey.is_module_patched("threading")
+    except ImportError:
+        patched = False
+
+    if patched:
+        # Under gevent workers `threading` is greenlet-based; use gevent's pool of
+        # real OS threads so hashing does not block the event loop.
+        from gevent.threadpool import ThreadPool
+        pool = ThreadPool(PASSWORD_HASH_WORKERS)
+        return lambda fn, *args: pool.spawn(fn, *args).get()
+
+    executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+    return lambda fn, *args: executor.submit(fn, *args).result()
+
+
+def hash_password(password: str) -> str:
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    return _run(bcrypt.hashpw, password.encode("utf-8"), salt).decode("utf-8")
+
+
+def check_password(password: str, hashed: str) -> bool:
+    return _run(bcrypt.checkpw, password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+def needs_rehash(hashed: str) -> bool:
+    """True when `hashed` was made with a work factor other than BCRYPT_ROUNDS."""
+    try:
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
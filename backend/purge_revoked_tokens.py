@@ -0,0 +1,61 @@
+# backend/purge_revoked_tokens.py
+#
+# Deletes revocations whose token has expired; an expired token is rejected by
+# jwt.decode anyway, so the row is dead weight in the revocation index.
+#
+# Usage:
+#   python -m backend.purge_revoked_tokens                  # one pass (cron)
+#   python -m backend.purge_revoked_tokens --interval 900   # run every 15 minutes
+
+import argparse
+import time
+from datetime import datetime
+
+from sqlalchemy import select, delete
+
+from .database import SessionLocal
+from .models import RevokedToken
+
+
+PURGE_BATCH_SIZE = 1000
+
+
+def purge_expired_revocations(batch_size=PURGE_BATCH_SIZE, now=None):
+    """Delete expired revocations in batches of `batch_size`; returns the number removed."""
+    now = now or datetime.utcnow()
+    purged = 0
+    while True:
+        # One short transaction per batch keeps row locks brief
+        with SessionLocal() as db:
+            ids = db.execute(
+                select(RevokedToken.id)
+                .where(RevokedToken.expires_at < now)
+                .order_by(RevokedToken.expires_at)
+                .limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                return purged
+            db.execute(delete(RevokedToken).where(RevokedToken.id.in_(ids)))
+            db.commit()
+        purged += len(ids)
+        if len(ids) < batch_size:
+            return purged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete expired token revocations.")
+    parser.add_argument("--batch-size", type=int, default=PURGE_BATCH_SIZE)
+    parser.add_argument("--interval", type=int, default=0,
+                        help="seconds between passes; 0 runs a single pass and exits")
+    args = parser.parse_args()
+
+    while True:
+        purged = purge_expired_revocations(args.batch_size)
+        print(f" Purged {purged} expired revoked token(s)")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
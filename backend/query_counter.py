@@ -0,0 +1,49 @@
+# backend/query_counter.py
+#
+# Query-count assertions for catching N+1 regressions, e.g. in a test:
+#
+#   with assert_max_queries(3):
+#       client.put(f"/api/notes/{note_id}/archive", headers=auth)
+#
+# backend/tests/test_query_counts.py pins the counts of the note routes on SQLite:
+#   python -m pytest backend/tests
+
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from .database import get_engine
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine=None):
+    """Count SQL statements sent to `engine` (default: the app engine) inside the block."""
+    engine = engine or get_engine()
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+
+
+@contextmanager
+def assert_max_queries(limit, engine=None):
+    """Fail with the offending statements if the block runs more than `limit` queries."""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        listing = "\n".join(f"  {i}. {s}" for i, s in enumerate(counter.statements, 1))
+        raise AssertionError(f"Expected at most {limit} queries, got {counter.count}:\n{listing}")
@@ -0,0 +1,107 @@
+# backend/sync.py
+
+from datetime import datetime, timedelta
+
+from flask import Blueprint, request, jsonify
+from sqlalchemy import select, asc, insert
+from sqlalchemy.orm import selectinload
+
+from .database import get_db
+from .models import Note, Tag, Tombstone
+from .auth import authenticate
+from .pagination import PaginationError, parse_limit, encode_cursor, decode_cursor, keyset_after
+
+
+sync_bp = Blueprint('sync', __name__)
+
+SYNC_PAGE_SIZE = 500
+SYNC_MAX_PAGE_SIZE = 2000
+# Rows stamped in the last few seconds may belong to transactions that have not
+# committed yet; they are left for the next sync so nothing is skipped.
+SYNC_SETTLE_SECONDS = 5
+SYNC_EPOCH = datetime(1970, 1, 1)
+
+# Sync token layout: [note updated_at, note id, tag/tombstone watermark]
+TOKEN_COLUMNS = [Note.updated_at, Note.id, Note.updated_at]
+
+
+def record_tombstones(db, user_id, entity, ids):
+    """Remember permanently deleted notes/tags for GET /sync; call inside the deleting transaction."""
+    if not ids:
+        return
+    now = datetime.utcnow()
+    db.execute(insert(Tombstone), [
+        {"user_id": user_id, "entity": entity, "entity_id": i, "deleted_at": now} for i in ids
+    ])
+
+
+@sync_bp.route('/sync', methods=['GET'])
+def sync():
+    """
+    Return what changed since the `since` token: notes created/updated/archived/
+    trashed, tags created/renamed, and ids of permanently deleted notes and tags.
+    Without `since` every note and tag is returned. Keep calling with `next_since`
+    while `has_more` is true.
+    """
+    user_id = authenticate()
+    if isinstance(user_id, tuple):
+        return user_id
+
+    try:
+        limit = parse_limit(request.args.get("limit"), default=SYNC_PAGE_SIZE, maximum=SYNC_MAX_PAGE_SIZE)
+        since = request.args.get("since")
+        if since:
+            note_after_ts, note_after_id, watermark = decode_cursor(since, TOKEN_COLUMNS, key="sync")
+        else:
+            note_after_ts, note_after_id, watermark = SYNC_EPOCH, 0, None
+
+        upper = datetime.utcnow() - timedelta(seconds=SYNC_SETTLE_SECONDS)
+
+        with next(get_db()) as db:
+            # Notes: (updated_at, id) keyset over ix_note_user_updated, oldest change first
+            notes = db.execute(
+                select(Note)
+                .where(
+                    Note.user_id == user_id,
+                    keyset_after([Note.updated_at, Note.id], [note_after_ts, note_after_id], descending=False),
+                    Note.updated_at <= upper,
+                )
+                .options(selectinload(Note.tags))
+                .order_by(asc(Note.updated_at), asc(Note.id))
+                .limit(limit + 1)
+            ).scalars().all()
+
+            has_more = len(notes) > limit
+            notes = notes[:limit]
+            if notes:
+                note_after_ts, note_after_id = notes[-1].updated_at, notes[-1].id
+
+            tag_stmt = select(Tag).where(Tag.user_id == user_id).order_by(Tag.name)
+            deleted_note_ids, deleted_tag_ids = [], []
+            if watermark is not None:
+                tag_stmt = tag_stmt.where(Tag.updated_at > watermark, Tag.updated_at <= upper)
+                tombstones = db.execute(
+                    select(Tombstone.entity, Tombstone.entity_id)
+                    .where(Tombstone.user_id == user_id, Tombstone.deleted_at > watermark, Tombstone.deleted_at <= upper)
+                ).all()
+                for entity, entity_id in tombstones:
+                    (deleted_note_ids if entity == "note" else deleted_tag_ids).append(entity_id)
+            tags = db.execute(tag_stmt).scalars().all()
+
+            return jsonify({
+                "success": True,
+                "notes": [n.to_dict() for n in notes],
+                "deleted_note_ids": deleted_note_ids,
+                "tags": [t.to_dict() for t in tags],
+                "deleted_tag_ids": deleted_tag_ids,
+                "has_more": has_more,
+                "next_since": encode_cursor([note_after_ts, note_after_id, upper], key="sync")
+            }), 200
+    except PaginationError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": "Failed to sync",
+            "details": str(e)
+        }), 500
@@ -0,0 +1,162 @@
+# backend/tag_cache.py
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import select
+
+from .models import Tag
+from .versioning import current_data_version
+
+
+# -----------------------------
+# Cache config
+# -----------------------------
+TAG_CACHE_MAX_USERS = 10_000
+# Entries carry the user's data version and are only served while it is current,
+# so a write handled by another worker (which bumps the version) is never answered
+# from a stale list. The TTL only bounds how long unused entries take up room.
+TAG_CACHE_TTL_SECONDS = 300
+
+
+class LocalTagCacheBackend:
+    """
+    In-process LRU with per-key expiry. Exposes the get/set(ex=)/delete subset of
+    the redis client API, so it can stand in for a shared backend in tests.
+    """
+
+    def __init__(self, max_entries=TAG_CACHE_MAX_USERS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[1] is not None and entry[1] <= now):
+                if entry is not None:
+                    del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ex=None):
+        expires_at = time.time() + ex if ex else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class TagCache:
+    """
+    Per-user tag list, [(id, name)] ordered by name, kept in a pluggable backend
+    together with the data version it was read at. Values are stored as JSON so
+    local and shared backends behave the same. Backend failures and entries from
+    another data version count as misses; the tag table stays the source of truth.
+    """
+
+    def __init__(self, backend=None, ttl=TAG_CACHE_TTL_SECONDS):
+        self.backend = backend or LocalTagCacheBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(user_id):
+        return f"tags:{user_id}"
+
+    def get(self, user_id, version):
+        try:
+            raw = self.backend.get(self._key(user_id))
+        except Exception:
+            raw = None
+        entry = json.loads(raw) if raw is not None else None
+        fresh = isinstance(entry, dict) and entry.get("version") == version
+        with self._lock:
+            if not fresh:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return [tuple(tag) for tag in entry["tags"]]
+
+    def put(self, user_id, version, tags):
+        value = json.dumps({"version": version, "tags": tags}, separators=(",", ":"))
+        try:
+            self.backend.set(self._key(user_id), value, ex=self.ttl)
+        except Exception:
+            pass
+
+    def invalidate(self, user_id):
+        """Forget the user's tags; call after committing any tag create/rename/delete."""
+        try:
+            self.backend.delete(self._key(user_id))
+        except Exception:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "backend": type(self.backend).__name__}
+
+
+tag_cache = TagCache()
+
+
+def use_redis_backend(url):
+    """Share the tag cache between workers through Redis (needs the `redis` package)."""
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError("TAG_CACHE_REDIS_URL is set but the redis package is not installed")
+    tag_cache.backend = redis.Redis.from_url(url)
+
+
+# -----------------------------
+# Lookups
+# -----------------------------
+def _load_user_tags(db, user_id, version):
+    tags = [tuple(row) for row in db.execute(
+        select(Tag.id, Tag.name).where(Tag.user_id == user_id).order_by(Tag.name)
+    ).all()]
+    tag_cache.put(user_id, version, tags)
+    return tags
+
+
+def user_tags(db, user_id):
+    """All of the user's tags as [(id, name)] ordered by name."""
+    version = current_data_version(db, user_id)
+    tags = tag_cache.get(user_id, version)
+    if tags is None:
+        tags = _load_user_tags(db, user_id, version)
+    return tags
+
+
+def find_user_tags(db, user_id, tag_ids):
+    """
+    Map id -> name (ordered by name) for the ids in `tag_ids` that belong to the
+    user, served from the cache; an id missing from the cached list triggers one
+    reload, in case the tag was created by another worker since it was cached.
+    Write routes do not use this: they need the tag rows locked until commit
+    (see notes._lock_user_tags), which a cached answer cannot give.
+    """
+    wanted = set(tag_ids)
+    version = current_data_version(db, user_id)
+    cached = tag_cache.get(user_id, version)
+    if cached is not None:
+        found = {tag_id: name for tag_id, name in cached if tag_id in wanted}
+        if len(found) == len(wanted):
+            return found
+    return {tag_id: name for tag_id, name in _load_user_tags(db, user_id, version) if tag_id in wanted}
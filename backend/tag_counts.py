@@ -0,0 +1,145 @@
+# backend/tag_counts.py
+#
+# Note counts per tag, split by note state. By default they are aggregated live
+# with one grouped query over note_tags joined to note. With TAG_COUNTS_TABLE on,
+# they are read from tag_note_count instead, which every note/tag write path keeps
+# up to date through record_links / record_note_moves; after turning it on, fill
+# the table once with `flask rebuild-tag-counts`.
+
+import os
+from collections import defaultdict
+
+from sqlalchemy import select, delete, insert, func, case, and_
+
+from .database import upsert
+from .models import Note, Tag, TagNoteCount, note_tags
+
+
+TAG_COUNTS_TABLE = os.environ.get("TAG_COUNTS_TABLE", "0").lower() in ("1", "true", "yes", "on")
+STATE_LOOKUP_CHUNK = 500
+
+BUCKETS = ("active", "archived", "trashed")
+
+
+def note_bucket(is_archived, is_deleted):
+    """Which count a note contributes to; trashed wins over archived, as in the listings."""
+    if is_deleted:
+        return "trashed"
+    return "archived" if is_archived else "active"
+
+
+# -----------------------------
+# Reading counts
+# -----------------------------
+def _aggregate_columns():
+    active = and_(Note.is_deleted == False, Note.is_archived == False)
+    archived = and_(Note.is_deleted == False, Note.is_archived == True)
+    return (
+        func.count(case((active, 1))).label("active"),
+        func.count(case((archived, 1))).label("archived"),
+        func.count(case((Note.is_deleted == True, 1))).label("trashed"),
+    )
+
+
+def _aggregate_query():
+    return (
+        select(Tag.id, Tag.name, *_aggregate_columns())
+        .outerjoin(note_tags, note_tags.c.tag_id == Tag.id)
+        .outerjoin(Note, Note.id == note_tags.c.note_id)
+        .group_by(Tag.id, Tag.name)
+    )
+
+
+def _counter_query():
+    counts = [func.coalesce(getattr(TagNoteCount, bucket), 0).label(bucket) for bucket in BUCKETS]
+    return select(Tag.id, Tag.name, *counts).outerjoin(TagNoteCount, TagNoteCount.tag_id == Tag.id)
+
+
+def tag_counts(db, user_id, top=None):
+    """
+    The user's tags with their active/archived/trashed note counts, ordered by
+    name, or the `top` tags with the most active notes.
+    """
+    stmt = (_counter_query() if TAG_COUNTS_TABLE else _aggregate_query()).where(Tag.user_id == user_id)
+    if top:
+        active = stmt.selected_columns.active
+        stmt = stmt.order_by(active.desc(), Tag.name).limit(top)
+    else:
+        stmt = stmt.order_by(Tag.name)
+    return [
+        {"id": row.id, "name": row.name, "counts": {bucket: row._mapping[bucket] for bucket in BUCKETS}}
+        for row in db.execute(stmt).all()
+    ]
+
+
+# -----------------------------
+# Maintaining tag_note_count
+# -----------------------------
+def record_links(db, user_id, links):
+    """
+    Apply count changes for (tag_id, bucket, delta) triples, e.g. (3, "active", 1)
+    when tag 3 is attached to an active note. Call inside the writing transaction.
+    """
+    if not TAG_COUNTS_TABLE:
+        return
+    per_tag = defaultdict(lambda: dict.fromkeys(BUCKETS, 0))
+    for tag_id, bucket, delta in links:
+        per_tag[tag_id][bucket] += delta
+    rows = [
+        {"tag_id": tag_id, "user_id": user_id, **counts}
+        for tag_id, counts in per_tag.items() if any(counts.values())
+    ]
+    if not rows:
+        return
+    table = TagNoteCount.__table__
+    db.execute(
+        upsert(
+            db, table, None,
+            lambda incoming: {bucket: table.c[bucket] + incoming[bucket] for bucket in BUCKETS},
+            key=["tag_id"],
+        ),
+        rows,
+    )
+
+
+def record_note_moves(db, user_id, moves):
+    """
+    Apply count changes for notes changing state: `moves` maps note id to
+    (old bucket, new bucket), with None for a note being created or deleted.
+    Reads the notes' tags, so call before their note_tags rows are removed.
+    """
+    if not TAG_COUNTS_TABLE:
+        return
+    moves = {note_id: move for note_id, move in moves.items() if move[0] != move[1]}
+    note_ids = list(moves)
+    links = []
+    for start in range(0, len(note_ids), STATE_LOOKUP_CHUNK):
+        chunk = note_ids[start:start + STATE_LOOKUP_CHUNK]
+        for note_id, tag_id in db.execute(
+            select(note_tags.c.note_id, note_tags.c.tag_id).where(note_tags.c.note_id.in_(chunk))
+        ).all():
+            old, new = moves[note_id]
+            if old:
+                links.append((tag_id, old, -1))
+            if new:
+                links.append((tag_id, new, 1))
+    record_links(db, user_id, links)
+
+
+def forget_tag(db, tag_id):
+    """Drop the counter row of a tag that is being deleted."""
+    db.execute(delete(TagNoteCount).where(TagNoteCount.tag_id == tag_id))
+
+
+def rebuild_tag_counts(db):
+    """Recompute tag_note_count for every tag from note_tags; returns the number of rows."""
+    aggregate = (
+        select(Tag.id, Tag.user_id, *_aggregate_columns())
+        .outerjoin(note_tags, note_tags.c.tag_id == Tag.id)
+        .outerjoin(Note, Note.id == note_tags.c.note_id)
+        .group_by(Tag.id, Tag.user_id)
+    )
+    db.execute(delete(TagNoteCount))
+    db.execute(insert(TagNoteCount).from_select(["tag_id", "user_id", *BUCKETS], aggregate))
+    db.commit()
+    return db.execute(select(func.count()).select_from(TagNoteCount)).scalar()
@@ -1,26 +1,57 @@
 # backend/tags.py
 
 from flask import Blueprint, request, jsonify
-from sqlalchemy import select
-from .database import get_db
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from .database import get_db, insert_ignore
 from .models import Tag
 from .auth import authenticate
+from .versioning import bump_data_version, conditional_get, add_validators
+from .sync import record_tombstones
+from .tag_cache import tag_cache, user_tags, find_user_tags
+from .tag_counts import tag_counts, forget_tag
+from .pagination import PaginationError, parse_limit
 
 tag_bp = Blueprint('tags', __name__)
+tag_bp.after_request(add_validators)
 
+BULK_MAX_TAGS = 500
+# Checked up front: INSERT IGNORE on MySQL would truncate an over-long name instead of failing
+TAG_NAME_MAX_LENGTH = Tag.name.type.length
+
+
+
+TOP_TAGS_MAX = 200
 
 
 @tag_bp.route('/tags', methods=['GET'])
 def get_tags():
+    """
+    List the user's tags by name. `?with_counts=1` adds active/archived/trashed
+    note counts per tag; `?top=N` returns only the N tags with the most active
+    notes (counts included).
+    """
     user_id = authenticate()
     if isinstance(user_id, tuple):
         return user_id
 
+    with_counts = request.args.get("with_counts") in ("1", "true")
+    top = None
+    if "top" in request.args:
+        try:
+            top = parse_limit(request.args["top"], maximum=TOP_TAGS_MAX)
+        except PaginationError as e:
+            return jsonify({"error": str(e).replace("limit", "top")}), 400
+
     with next(get_db()) as db:
-        stmt = select(Tag).where(Tag.user_id == user_id).order_by(Tag.name)
-        tags = db.execute(stmt).scalars().all()
+        not_modified = conditional_get(db, user_id)
+        if not_modified:
+            return not_modified
+        if with_counts or top:
+            return jsonify({"tags": tag_counts(db, user_id, top=top)}), 200
+        tags = user_tags(db, user_id)
 
-        return jsonify({"tags": [t.to_dict() for t in tags]}), 200
+        return jsonify({"tags": [{"id": tag_id, "name": name} for tag_id, name in tags]}), 200
 
 
 
@@ -31,13 +62,15 @@ def get_tag(tag_id):
         return user_id
 
     with next(get_db()) as db:
-        stmt = select(Tag).where(Tag.id == tag_id, Tag.user_id == user_id)
-        tag = db.execute(stmt).scalars().first()
+        not_modified = conditional_get(db, user_id)
+        if not_modified:
+            return not_modified
+        found = find_user_tags(db, user_id, [tag_id])
 
-        if not tag:
+        if not found:
             return jsonify({"error": "Tag not found"}), 404
 
-        return jsonify({"tag": tag.to_dict()}), 200
+        return jsonify({"tag": {"id": tag_id, "name": found[tag_id]}}), 200
 
 
 
@@ -51,18 +84,27 @@ def create_tag():
     name = data.get('name', '').strip()
     if not name:
         return jsonify({"error": "Tag name is required"}), 400
+    if len(name) > TAG_NAME_MAX_LENGTH:
+        return jsonify({"error": f"Tag names are limited to {TAG_NAME_MAX_LENGTH} characters"}), 400
 
     with next(get_db()) as db:
-      
-        stmt = select(Tag).where(Tag.name == name, Tag.user_id == user_id)
-        if db.execute(stmt).scalars().first():
-            return jsonify({"error": "Tag already exists"}), 400
-
-        tag = Tag(name=name, user_id=user_id)
-        db.add(tag)
+        # ux_tag_user_name makes this a single race-free statement
+        result = db.execute(insert_ignore(db, Tag.__table__).values(user_id=user_id, name=name))
+        if not result.rowcount:
+            existing = db.execute(
+                select(Tag.id, Tag.name).where(Tag.user_id == user_id, Tag.name == name)
+            ).first()
+            return jsonify({
+                "error": "Tag already exists",
+                "tag": {"id": existing.id, "name": existing.name} if existing else None
+            }), 400
+
+        bump_data_version(db, user_id)
         db.commit()
+        tag_cache.invalidate(user_id)
 
-        return jsonify({"message": "Tag created", "tag": tag.to_dict()}), 201
+        tag = {"id": result.inserted_primary_key[0], "name": name}
+        return jsonify({"message": "Tag created", "tag": tag}), 201
 
 
 
@@ -78,23 +120,27 @@ def update_tag(tag_id):
     name = data.get('name', '').strip()
     if not name:
         return jsonify({"error": "Tag name is required"}), 400
+    if len(name) > TAG_NAME_MAX_LENGTH:
+        return jsonify({"error": f"Tag names are limited to {TAG_NAME_MAX_LENGTH} characters"}), 400
 
     with next(get_db()) as db:
-        stmt = select(Tag).where(Tag.id == tag_id, Tag.user_id == user_id)
-        tag = db.execute(stmt).scalars().first()
+        try:
+            renamed = db.execute(
+                update(Tag).where(Tag.id == tag_id, Tag.user_id == user_id).values(name=name)
+            ).rowcount
+        except IntegrityError:
+            # ux_tag_user_name: another of the user's tags has this name
+            db.rollback()
+            return jsonify({"error": "Tag name already exists"}), 400
 
-        if not tag:
+        if not renamed:
             return jsonify({"error": "Tag not found"}), 404
 
-       
-        stmt_check = select(Tag).where(Tag.user_id == user_id, Tag.name == name, Tag.id != tag_id)
-        if db.execute(stmt_check).scalars().first():
-            return jsonify({"error": "Tag name already exists"}), 400
-
-        tag.name = name
+        bump_data_version(db, user_id)
         db.commit()
+        tag_cache.invalidate(user_id)
 
-        return jsonify({"message": "Tag updated", "tag": tag.to_dict()}), 200
+        return jsonify({"message": "Tag updated", "tag": {"id": tag_id, "name": name}}), 200
 
 
 
@@ -111,7 +157,51 @@ def delete_tag(tag_id):
         if not tag:
             return jsonify({"error": "Tag not found"}), 404
 
+        forget_tag(db, tag_id)
         db.delete(tag)
+        record_tombstones(db, user_id, "tag", [tag_id])
+        bump_data_version(db, user_id)
         db.commit()
+        tag_cache.invalidate(user_id)
 
         return jsonify({"message": "Tag deleted"}), 200
+
+
+
+@tag_bp.route('/tags/bulk', methods=['POST'])
+def bulk_create_tags():
+    """
+    Create-or-fetch many tags by name. Body: {"names": ["work", "ideas", ...]}.
+    Missing tags are added with one INSERT that skips names the user already has;
+    returns every requested tag (ordered by name) and how many were created.
+    """
+    user_id = authenticate()
+    if isinstance(user_id, tuple):
+        return user_id
+
+    names = (request.get_json() or {}).get("names")
+    if not isinstance(names, list) or not names or not all(isinstance(n, str) and n.strip() for n in names):
+        return jsonify({"error": "names must be a non-empty list of tag names"}), 400
+    names = list(dict.fromkeys(n.strip() for n in names))
+    if len(names) > BULK_MAX_TAGS:
+        return jsonify({"error": f"At most {BULK_MAX_TAGS} names per request"}), 400
+    if any(len(n) > TAG_NAME_MAX_LENGTH for n in names):
+        return jsonify({"error": f"Tag names are limited to {TAG_NAME_MAX_LENGTH} characters"}), 400
+
+    with next(get_db()) as db:
+        created = db.execute(
+            insert_ignore(db, Tag.__table__).values([{"user_id": user_id, "name": n} for n in names])
+        ).rowcount
+        tags = db.execute(
+            select(Tag.id, Tag.name).where(Tag.user_id == user_id, Tag.name.in_(names)).order_by(Tag.name)
+        ).all()
+        if created:
+            bump_data_version(db, user_id)
+        db.commit()
+        if created:
+            tag_cache.invalidate(user_id)
+
+        return jsonify({
+            "tags": [{"id": t.id, "name": t.name} for t in tags],
+            "created": created
+        }), 200
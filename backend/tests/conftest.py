@@ -0,0 +1,34 @@
+import pytest
+
+from backend import create_app
+from backend.database import get_engine
+from backend.migrations import migrate
+from backend.tag_cache import tag_cache
+from backend.token_cache import token_cache
+
+
+@pytest.fixture
+def app():
+    # In-memory SQLite: SQLAlchemy keeps one connection per thread, which the
+    # test client shares with the test itself
+    app = create_app({"DATABASE_URL": "sqlite://", "TESTING": True})
+    migrate(get_engine(), out=lambda *a: None)
+    tag_cache.backend.clear()
+    token_cache.clear()
+    yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth(client):
+    client.post("/api/auth/signup", json={"username": "alice", "email": "alice@example.com", "password": "Password1"})
+    token = client.post("/api/auth/login", json={"email": "alice@example.com", "password": "Password1"}).get_json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    # Verify the token once so the counts below do not include the revocation check
+    client.get("/ping", headers=headers)
+    client.get("/api/tags", headers=headers)
+    return headers
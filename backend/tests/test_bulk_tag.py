@@ -0,0 +1,103 @@
+# POST /notes/bulk with action=tag when another request writes in between: a
+# concurrent attach to one of the notes, and a delete of the tag itself. SQLite
+# has no row locks, so the other request's committed writes are played from
+# inside the bulk request's transaction, at the point where they would land.
+
+import pytest
+from sqlalchemy import delete, insert, select
+
+from backend import notes, tag_counts
+from backend.models import Tag, note_tags
+from backend.tag_counts import forget_tag, record_links
+
+
+@pytest.fixture(autouse=True)
+def counts_table(monkeypatch):
+    monkeypatch.setattr(tag_counts, "TAG_COUNTS_TABLE", True)
+
+
+@pytest.fixture
+def tag_id(client, auth):
+    return client.post("/api/tags", json={"name": "work"}, headers=auth).get_json()["tag"]["id"]
+
+
+@pytest.fixture
+def note_ids(client, auth):
+    return [client.post("/api/notes", json={"title": f"Note {i}"}, headers=auth).get_json()["note"]["id"]
+            for i in range(3)]
+
+
+def _counts(client, auth):
+    return {tag["id"]: tag["counts"] for tag in client.get("/api/tags?with_counts=1", headers=auth).get_json()["tags"]}
+
+
+def _user_id(db, tag_id):
+    return db.execute(select(Tag.user_id).where(Tag.id == tag_id)).scalar()
+
+
+def test_concurrent_attach(client, auth, monkeypatch, tag_id, note_ids):
+    real_insert_ignore = notes.insert_ignore
+    raced = []
+
+    def insert_ignore(db, table):
+        if not raced:
+            # A single attach of the tag to the second note commits just before the bulk insert
+            raced.append(note_ids[1])
+            db.execute(insert(note_tags).values(note_id=note_ids[1], tag_id=tag_id))
+            record_links(db, _user_id(db, tag_id), [(tag_id, "active", 1)])
+            db.commit()
+        return real_insert_ignore(db, table)
+
+    monkeypatch.setattr(notes, "insert_ignore", insert_ignore)
+    response = client.post("/api/notes/bulk", json={"action": "tag", "ids": note_ids, "tag_id": tag_id}, headers=auth)
+
+    assert raced
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["affected"] == 2
+    assert body["results"] == [
+        {"id": note_ids[0], "success": True},
+        {"id": note_ids[1], "success": False, "error": "Tag already attached"},
+        {"id": note_ids[2], "success": True},
+    ]
+    # Each note counted once, the raced one by the single attach only
+    assert _counts(client, auth)[tag_id] == {"active": 3, "archived": 0, "trashed": 0}
+
+
+def test_tag_deleted_during_retry(client, auth, monkeypatch, tag_id, note_ids):
+    other = client.post("/api/tags", json={"name": "home"}, headers=auth).get_json()["tag"]["id"]
+    client.post(f"/api/notes/{note_ids[0]}/tags", json={"tag_id": other}, headers=auth)
+    real_insert_ignore, real_lock_bulk_notes = notes.insert_ignore, notes._lock_bulk_notes
+    raced = []
+
+    def insert_ignore(db, table):
+        if not raced:
+            raced.append("attach")
+            db.execute(insert(note_tags).values(note_id=note_ids[1], tag_id=tag_id))
+            record_links(db, _user_id(db, tag_id), [(tag_id, "active", 1)])
+            db.commit()
+        return real_insert_ignore(db, table)
+
+    def lock_bulk_notes(db, user_id, ids):
+        if raced == ["attach"]:
+            # The tag delete was waiting on the first attempt's share lock; it runs
+            # once that attempt rolls back, before the retry reads again
+            raced.append("delete")
+            forget_tag(db, tag_id)
+            db.execute(delete(note_tags).where(note_tags.c.tag_id == tag_id))
+            db.execute(delete(Tag).where(Tag.id == tag_id))
+            db.commit()
+        return real_lock_bulk_notes(db, user_id, ids)
+
+    monkeypatch.setattr(notes, "insert_ignore", insert_ignore)
+    monkeypatch.setattr(notes, "_lock_bulk_notes", lock_bulk_notes)
+    response = client.post("/api/notes/bulk", json={"action": "tag", "ids": note_ids, "tag_id": tag_id}, headers=auth)
+
+    assert raced == ["attach", "delete"]
+    assert response.status_code == 404
+    assert response.get_json() == {"success": False, "error": "Tag not found"}
+    # Nothing left behind for the deleted tag; the other tag's count is untouched
+    assert _counts(client, auth) == {other: {"active": 1, "archived": 0, "trashed": 0}}
+    for note_id in note_ids:
+        tags = client.get(f"/api/notes/{note_id}", headers=auth).get_json()["note"]["tags"]
+        assert tag_id not in [tag["id"] for tag in tags]
@@ -0,0 +1,105 @@
+# Keyset pagination of the note listings: walking `next_cursor` returns every note
+# exactly once in the listing's order, also when notes tie on the sort column
+# (the id breaks the tie), and a cursor that was not produced for the requested
+# ordering is a 400.
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import update
+
+from backend.database import get_db
+from backend.models import Note
+from backend.pagination import encode_cursor
+
+# (title, created_at, updated_at): every sort column has ties
+NOTES = [
+    ("b", datetime(2024, 1, 1), datetime(2024, 3, 1)),
+    ("a", datetime(2024, 1, 1), datetime(2024, 3, 1)),
+    ("b", datetime(2024, 1, 1), datetime(2024, 2, 1)),
+    ("a", datetime(2024, 1, 2), datetime(2024, 3, 1)),
+    ("c", datetime(2024, 1, 2), datetime(2024, 2, 1)),
+    ("a", datetime(2024, 1, 3), datetime(2024, 2, 1)),
+    ("b", datetime(2024, 1, 3), datetime(2024, 3, 1)),
+]
+
+SORTS = [(sort, order) for sort in ("created_at", "updated_at", "title") for order in ("asc", "desc")]
+
+
+@pytest.fixture
+def note_ids(client, auth):
+    ids = [client.post("/api/notes", json={"title": title}, headers=auth).get_json()["note"]["id"]
+           for title, _, _ in NOTES]
+    with next(get_db()) as db:
+        for note_id, (_, created_at, updated_at) in zip(ids, NOTES):
+            db.execute(update(Note).where(Note.id == note_id).values(created_at=created_at, updated_at=updated_at))
+        db.commit()
+    return ids
+
+
+def _expected(note_ids, sort, order):
+    column = {"title": 0, "created_at": 1, "updated_at": 2}[sort]
+    rows = sorted(zip(note_ids, NOTES), key=lambda row: (row[1][column], row[0]), reverse=order == "desc")
+    return [note_id for note_id, _ in rows]
+
+
+def _walk(client, auth, url):
+    ids, cursor, pages = [], None, 0
+    while True:
+        response = client.get(url + (f"&cursor={cursor}" if cursor else ""), headers=auth)
+        assert response.status_code == 200
+        body = response.get_json()
+        ids += [note["id"] for note in body["notes"]]
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return ids, pages
+
+
+@pytest.mark.parametrize("sort, order", SORTS)
+@pytest.mark.parametrize("limit", [1, 3])
+def test_cursor_round_trip(client, auth, note_ids, sort, order, limit):
+    ids, pages = _walk(client, auth, f"/api/notes?sort={sort}&order={order}&limit={limit}")
+    assert ids == _expected(note_ids, sort, order)
+    assert pages == -(-len(NOTES) // limit)
+
+    # The unpaginated listing agrees
+    body = client.get(f"/api/notes?sort={sort}&order={order}", headers=auth).get_json()
+    assert [note["id"] for note in body["notes"]] == ids
+    assert body["next_cursor"] is None
+
+
+def _first_cursor(client, auth, sort="created_at", order="desc"):
+    return client.get(f"/api/notes?sort={sort}&order={order}&limit=2", headers=auth).get_json()["next_cursor"]
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    "!!!",
+    encode_cursor({"created_at": 1}),
+    encode_cursor(["created_at:desc"]),
+    encode_cursor(["created_at:desc", "2024-01-01T00:00:00", 1, 2]),
+    encode_cursor(["created_at:desc", "yesterday", 1]),
+    encode_cursor(["created_at:desc", "2024-01-01T00:00:00", "1"]),
+    encode_cursor(["2024-01-01T00:00:00", 1]),
+])
+def test_malformed_cursor(client, auth, note_ids, cursor):
+    response = client.get(f"/api/notes?sort=created_at&order=desc&cursor={cursor}", headers=auth)
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+
+
+def test_tampered_cursor(client, auth, note_ids):
+    cursor = _first_cursor(client, auth)
+    # Cut short, or with a character of the payload changed
+    for tampered in (cursor[:-4], cursor[:10] + ("A" if cursor[10] != "A" else "B") + cursor[11:]):
+        response = client.get(f"/api/notes?sort=created_at&order=desc&cursor={tampered}", headers=auth)
+        assert response.status_code == 400
+
+
+@pytest.mark.parametrize("sort, order", [("created_at", "asc"), ("updated_at", "desc"), ("title", "asc")])
+def test_cursor_from_another_ordering(client, auth, note_ids, sort, order):
+    cursor = _first_cursor(client, auth, "created_at", "desc")
+    response = client.get(f"/api/notes?sort={sort}&order={order}&cursor={cursor}", headers=auth)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Cursor does not match the requested sort order"
@@ -0,0 +1,93 @@
+# Pins the number of SQL statements per note route on SQLite, so an N+1 or an
+# extra round trip shows up as a failure listing the statements. When a change
+# legitimately alters a count, update the number here in the same commit.
+
+import pytest
+
+from backend.query_counter import assert_max_queries
+
+
+@pytest.fixture
+def tag_id(client, auth):
+    return client.post("/api/tags", json={"name": "work"}, headers=auth).get_json()["tag"]["id"]
+
+
+@pytest.fixture
+def note_id(client, auth, tag_id):
+    response = client.post("/api/notes", json={"title": "Note", "content": "Body", "tag_ids": [tag_id]}, headers=auth)
+    return response.get_json()["note"]["id"]
+
+
+def test_create_note(client, auth):
+    # note insert, data version bump
+    with assert_max_queries(2):
+        response = client.post("/api/notes", json={"title": "Note"}, headers=auth)
+    assert response.status_code == 201
+
+
+def test_create_note_with_tags(client, auth, tag_id):
+    # tag lookup, note insert, note_tags insert, data version bump
+    with assert_max_queries(4):
+        response = client.post("/api/notes", json={"title": "Note", "tag_ids": [tag_id]}, headers=auth)
+    assert response.status_code == 201
+    assert response.get_json()["note"]["tags"] == [{"id": tag_id, "name": "work"}]
+
+
+def test_get_note(client, auth, note_id):
+    # data version, note joined with its tags
+    with assert_max_queries(2):
+        response = client.get(f"/api/notes/{note_id}", headers=auth)
+    assert response.status_code == 200
+    assert [t["name"] for t in response.get_json()["note"]["tags"]] == ["work"]
+
+
+def test_update_note(client, auth, note_id):
+    # note, its tags, note update, data version bump
+    with assert_max_queries(4):
+        response = client.put(f"/api/notes/{note_id}", json={"title": "Renamed"}, headers=auth)
+    assert response.status_code == 200
+    assert response.get_json()["note"]["title"] == "Renamed"
+
+
+ARCHIVE = ("put", "/archive")
+TRASH = ("delete", "")
+
+
+@pytest.mark.parametrize("setup, action", [
+    (None, ARCHIVE),
+    (ARCHIVE, ("put", "/unarchive")),
+    (None, TRASH),
+    (TRASH, ("put", "/recover")),
+])
+def test_note_state_changes(client, auth, note_id, setup, action):
+    if setup:
+        getattr(client, setup[0])(f"/api/notes/{note_id}{setup[1]}", headers=auth)
+    method, path = action
+    # note, its tags, note update, data version bump
+    with assert_max_queries(4):
+        response = getattr(client, method)(f"/api/notes/{note_id}{path}", headers=auth)
+    assert response.status_code == 200
+
+
+def test_attach_tag(client, auth, note_id):
+    other = client.post("/api/tags", json={"name": "home"}, headers=auth).get_json()["tag"]["id"]
+    # note, tag, note_tags insert, note touch, data version bump
+    with assert_max_queries(5):
+        response = client.post(f"/api/notes/{note_id}/tags", json={"tag_id": other}, headers=auth)
+    assert response.status_code == 200
+
+
+def test_detach_tag(client, auth, note_id, tag_id):
+    # note, tag, note_tags delete, note touch, data version bump
+    with assert_max_queries(5):
+        response = client.delete(f"/api/notes/{note_id}/tags/{tag_id}", headers=auth)
+    assert response.status_code == 200
+
+
+def test_replace_tags(client, auth, note_id, tag_id):
+    other = client.post("/api/tags", json={"name": "home"}, headers=auth).get_json()["tag"]["id"]
+    # note (locked), tags, current links, delete, insert, note touch, data version bump
+    with assert_max_queries(7):
+        response = client.put(f"/api/notes/{note_id}/tags", json={"tag_ids": [other]}, headers=auth)
+    assert response.status_code == 200
+    assert response.get_json()["removed"] == [tag_id]
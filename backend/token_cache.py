@@ -0,0 +1,92 @@
+# backend/token_cache.py
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+# -----------------------------
+# Cache config
+# -----------------------------
+TOKEN_CACHE_MAX_ENTRIES = 10_000
+# Upper bound on how long a verified token is trusted without re-checking the
+# revocation table. Logout only clears the cache of the worker that served it,
+# so other workers may accept a revoked token for at most this many seconds.
+TOKEN_CACHE_TTL_SECONDS = 60
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenCache:
+    """Bounded LRU of verified JWTs plus a set of tokens revoked by this process."""
+
+    def __init__(self, max_entries=TOKEN_CACHE_MAX_ENTRIES, ttl=TOKEN_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._verified = OrderedDict()  # token hash -> (user_id, expires_at)
+        self._revoked = {}              # token hash -> expires_at
+        self._lock = threading.Lock()
+
+    def get(self, token_hash):
+        """Return the cached user_id for a verified token, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._verified.get(token_hash)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._verified[token_hash]
+                self.misses += 1
+                return None
+            self._verified.move_to_end(token_hash)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token_hash, user_id, exp):
+        """Remember a verified token until its `exp` (capped by the cache TTL)."""
+        expires_at = min(exp, time.time() + self.ttl)
+        with self._lock:
+            self._verified[token_hash] = (user_id, expires_at)
+            self._verified.move_to_end(token_hash)
+            while len(self._verified) > self.max_entries:
+                self._verified.popitem(last=False)
+
+    def is_revoked(self, token_hash):
+        with self._lock:
+            expires_at = self._revoked.get(token_hash)
+            if expires_at is not None and expires_at <= time.time():
+                # An expired token is rejected by jwt.decode anyway
+                del self._revoked[token_hash]
+                return False
+            return expires_at is not None
+
+    def revoke(self, token_hash, exp):
+        """Drop a token from the verified cache and reject it until it expires."""
+        now = time.time()
+        with self._lock:
+            self._verified.pop(token_hash, None)
+            self._revoked[token_hash] = exp
+            if len(self._revoked) > self.max_entries:
+                self._revoked = {h: e for h, e in self._revoked.items() if e > now}
+
+    def clear(self):
+        with self._lock:
+            self._verified.clear()
+            self._revoked.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._verified),
+                "revoked": len(self._revoked),
+            }
+
+
+token_cache = TokenCache()
@@ -0,0 +1,497 @@
+# backend/transfer.py
+#
+# Bulk export and import of a user's notes. Both directions stream: exports read
+# through a server-side cursor and write rows as they arrive, imports read the
+# request body line by line and write in chunked transactions, so memory use does
+# not grow with the number of notes.
+
+import io
+import json
+import re
+import zipfile
+from datetime import datetime, timezone
+
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from sqlalchemy import select, insert, func, literal, union_all
+from sqlalchemy.exc import SQLAlchemyError
+
+from .database import SessionLocal, insert_ignore
+from .models import Note, Tag, note_tags
+from .auth import authenticate
+from .notes import NOTE_COLUMNS, _note_dict
+from .versioning import bump_data_version
+from .tag_cache import tag_cache
+from .tag_counts import note_bucket, record_links
+
+
+transfer_bp = Blueprint('transfer', __name__)
+
+# Rows buffered per fetch from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+# Output is flushed to the client in chunks of roughly this size
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_SCOPES = {
+    "all": [],
+    "active": [Note.is_archived == False, Note.is_deleted == False],
+    "archived": [Note.is_archived == True, Note.is_deleted == False],
+    "trash": [Note.is_deleted == True],
+}
+EXPORT_FORMATS = ("ndjson", "markdown")
+
+
+# -----------------------------
+# Helper: streamed note rows
+# -----------------------------
+def _tags_json(dialect):
+    """
+    Correlated subquery: the note's tags as a JSON array of {"id", "name"} objects
+    (NULL or [] when it has none), so note content is sent once however many tags
+    the note has.
+    """
+    if dialect == "mysql":
+        agg = func.json_arrayagg(func.json_object("id", Tag.id, "name", Tag.name))
+    elif dialect == "postgresql":
+        agg = func.json_agg(func.json_build_object("id", Tag.id, "name", Tag.name))
+    else:
+        agg = func.json_group_array(func.json_object("id", Tag.id, "name", Tag.name))
+    return (
+        select(agg)
+        .select_from(note_tags.join(Tag, Tag.id == note_tags.c.tag_id))
+        .where(note_tags.c.note_id == Note.id)
+        .scalar_subquery()
+        .label("tags_json")
+    )
+
+
+def _export_notes(user_id, filters):
+    """
+    Yield (row, tags) for each of the user's notes in id order. Tags are aggregated
+    per note inside the same statement, since a connection cannot run a second
+    query while a server-side cursor is open on it. Uses its own session because the
+    response body is generated after the request's session has been closed.
+    """
+    with SessionLocal() as db:
+        stmt = (
+            select(*NOTE_COLUMNS, _tags_json(db.get_bind().dialect.name))
+            .where(Note.user_id == user_id, *filters)
+            .order_by(Note.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)  # implies stream_results
+        )
+        for row in db.execute(stmt):
+            tags = row.tags_json
+            # psycopg decodes json itself; MySQL and SQLite return text
+            if isinstance(tags, (str, bytes)):
+                tags = json.loads(tags)
+            yield row, tags or []
+
+
+def _chunked(pieces):
+    """Coalesce many small byte strings into EXPORT_CHUNK_BYTES-sized writes."""
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+# -----------------------------
+# Helper: NDJSON
+# -----------------------------
+def _ndjson_lines(notes, dumps):
+    for row, tags in notes:
+        yield dumps(_note_dict(row, tags)).encode("utf-8") + b"\n"
+
+
+# -----------------------------
+# Helper: zipped Markdown
+# -----------------------------
+class _ZipSink(io.RawIOBase):
+    """Unseekable write target for ZipFile; the generator drains what was written so far."""
+
+    def __init__(self):
+        self._pending = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._pending.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._pending)
+        self._pending = []
+        return data
+
+
+def _slug(title):
+    slug = re.sub(r"[^a-z0-9]+", "-", (title or "").lower()).strip("-")
+    return slug[:60].rstrip("-") or "untitled"
+
+
+def _markdown(row, tags):
+    """Note as Markdown with YAML front matter (values are JSON, which YAML accepts)."""
+    front_matter = [
+        f"id: {row.id}",
+        f"title: {json.dumps(row.title, ensure_ascii=False)}",
+        f"tags: {json.dumps([t['name'] for t in tags], ensure_ascii=False)}",
+        f"created_at: {row.created_at.isoformat() if row.created_at else 'null'}",
+        f"updated_at: {row.updated_at.isoformat() if row.updated_at else 'null'}",
+        f"archived: {json.dumps(bool(row.is_archived))}",
+        f"deleted: {json.dumps(bool(row.is_deleted))}",
+    ]
+    return "---\n" + "\n".join(front_matter) + "\n---\n\n" + (row.content or "") + "\n"
+
+
+def _markdown_zip(notes):
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for row, tags in notes:
+            folder = "trash" if row.is_deleted else "archived" if row.is_archived else "notes"
+            info = zipfile.ZipInfo(
+                f"{folder}/{row.id}-{_slug(row.title)}.md",
+                date_time=(row.updated_at or datetime.utcnow()).timetuple()[:6],
+            )
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, _markdown(row, tags))
+            yield sink.drain()
+    # Central directory, written when the archive is closed
+    yield sink.drain()
+
+
+# -----------------------------
+# Export route
+# -----------------------------
+@transfer_bp.route('/notes/export', methods=['GET'])
+def export_notes():
+    """
+    Stream every note of the user, with tags.
+    `?format=ndjson` (default): one Note.to_dict()-shaped JSON object per line.
+    `?format=markdown`: a zip of notes/, archived/ and trash/ Markdown files.
+    `?scope=all|active|archived|trash` limits which notes are exported (default all).
+    """
+    user_id = authenticate()
+    if isinstance(user_id, tuple):
+        return user_id
+
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"success": False, "error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    scope = request.args.get("scope", "all")
+    if scope not in EXPORT_SCOPES:
+        return jsonify({"success": False, "error": f"scope must be one of: {', '.join(EXPORT_SCOPES)}"}), 400
+
+    notes = _export_notes(user_id, EXPORT_SCOPES[scope])
+    stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    if export_format == "ndjson":
+        body = _ndjson_lines(notes, current_app.json.dumps)
+        mimetype, filename = "application/x-ndjson", f"notes-{stamp}.ndjson"
+    else:
+        body = _markdown_zip(notes)
+        mimetype, filename = "application/zip", f"notes-{stamp}.zip"
+
+    return Response(
+        _chunked(body),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+        },
+    )
+
+
+# -----------------------------
+# Import config
+# -----------------------------
+# A chunk is committed once it reaches either limit
+IMPORT_BATCH_SIZE = 500
+IMPORT_BATCH_BYTES = 4 * 1024 * 1024
+IMPORT_MAX_LINE_BYTES = 1024 * 1024
+# Per-line errors listed in the result; later ones are only counted
+IMPORT_MAX_ERRORS = 100
+
+TITLE_MAX_LENGTH = Note.title.type.length
+TAG_NAME_MAX_LENGTH = Tag.name.type.length
+
+
+class ImportLineError(ValueError):
+    """Raised when one line of an import cannot be turned into a note."""
+
+
+# -----------------------------
+# Helper: reading the import body
+# -----------------------------
+def _import_lines(stream):
+    """Yield (line number, bytes) for each non-blank line; over-long lines come back as None."""
+    line_no = 0
+    while True:
+        line = stream.readline(IMPORT_MAX_LINE_BYTES + 1)
+        if not line:
+            return
+        line_no += 1
+        if len(line) > IMPORT_MAX_LINE_BYTES and not line.endswith(b"\n"):
+            # Skip the rest of the line without buffering it
+            while line and not line.endswith(b"\n"):
+                line = stream.readline(IMPORT_MAX_LINE_BYTES)
+            yield line_no, None
+        elif line.strip():
+            yield line_no, line
+
+
+def _parse_timestamp(value, field):
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ImportLineError(f"{field} must be an ISO 8601 string")
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ImportLineError(f"{field} must be an ISO 8601 string")
+    # Stored naive in UTC, like datetime.utcnow()
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _parse_note(line, loads, now):
+    """
+    Validate one NDJSON line. Accepts what the export writes: title, content,
+    is_archived, is_deleted, created_at and tags as names or {"name": ...}
+    objects. `id`, `user_id` and `updated_at` are ignored: an imported note is
+    changed as of `now`, so GET /sync delivers it to clients that synced before.
+    Returns (note column values, [tag names]).
+    """
+    if line is None:
+        raise ImportLineError(f"Line is longer than {IMPORT_MAX_LINE_BYTES} bytes")
+    try:
+        data = loads(line)
+    except ValueError:
+        raise ImportLineError("Invalid JSON")
+    if not isinstance(data, dict):
+        raise ImportLineError("Each line must be a JSON object")
+
+    title = data.get("title")
+    if not isinstance(title, str) or not title.strip():
+        raise ImportLineError("title is required")
+    title = title.strip()
+    if len(title) > TITLE_MAX_LENGTH:
+        raise ImportLineError(f"title is longer than {TITLE_MAX_LENGTH} characters")
+
+    content = data.get("content")
+    if content is not None and not isinstance(content, str):
+        raise ImportLineError("content must be a string")
+
+    flags = {}
+    for field in ("is_archived", "is_deleted"):
+        value = data.get(field, False)
+        if not isinstance(value, bool):
+            raise ImportLineError(f"{field} must be a boolean")
+        flags[field] = value
+
+    created_at = _parse_timestamp(data.get("created_at"), "created_at") or now
+
+    raw_tags = data.get("tags") or []
+    if not isinstance(raw_tags, list):
+        raise ImportLineError("tags must be a list")
+    tag_names = []
+    for tag in raw_tags:
+        name = tag.get("name") if isinstance(tag, dict) else tag
+        if not isinstance(name, str) or not name.strip():
+            raise ImportLineError("tags must be non-empty names or {\"name\": ...} objects")
+        name = name.strip()
+        if len(name) > TAG_NAME_MAX_LENGTH:
+            raise ImportLineError(f"tag name is longer than {TAG_NAME_MAX_LENGTH} characters")
+        if name not in tag_names:
+            tag_names.append(name)
+
+    values = {
+        "title": title,
+        "content": content or "",
+        "created_at": created_at,
+        "updated_at": now,
+        **flags,
+    }
+    return values, tag_names
+
+
+# -----------------------------
+# Helper: writing an import chunk
+# -----------------------------
+class _TagResolver:
+    """
+    Per-import cache of tag name -> id; unknown names are looked up or created per
+    chunk. Names are matched by the database, so under a case- or accent-insensitive
+    collation "Work" resolves to an existing "work" and is keyed by the name as
+    written in the file.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.ids = {}
+        self.created = 0
+
+    def resolve(self, db, names):
+        missing = [name for name in names if name not in self.ids]
+        if not missing:
+            return
+        for tag_id, name in self._lookup(db, missing):
+            self.ids.setdefault(name, tag_id)
+        new = [name for name in missing if name not in self.ids]
+        if new:
+            # Skips names a concurrent request created in the meantime (ux_tag_user_name)
+            self.created += db.execute(
+                insert_ignore(db, Tag.__table__).values([{"user_id": self.user_id, "name": name} for name in new])
+            ).rowcount
+            for tag_id, name in self._lookup(db, new):
+                self.ids.setdefault(name, tag_id)
+
+    def _lookup(self, db, names):
+        """(tag id, requested name) for each requested name that matches a stored tag."""
+        requested = union_all(*[select(literal(name, Tag.name.type).label("name")) for name in names]).subquery()
+        return db.execute(
+            select(Tag.id, requested.c.name)
+            .join(requested, Tag.name == requested.c.name)
+            .where(Tag.user_id == self.user_id)
+            .order_by(Tag.id)
+        ).all()
+
+    def forget(self, names):
+        """Drop names whose creation was rolled back with a failed chunk."""
+        for name in names:
+            self.ids.pop(name, None)
+
+
+def _insert_notes(db, rows):
+    """Insert `rows` into note and return their ids in order."""
+    dialect = db.get_bind().dialect
+    if dialect.insert_executemany_returning_sort_by_parameter_order:
+        return db.execute(
+            insert(Note).returning(Note.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+    # No RETURNING (MySQL): one statement per row, since the ids of a multi-row
+    # INSERT need not be consecutive (innodb_autoinc_lock_mode=2, the MySQL 8
+    # default) and executemany is folded into exactly such a statement. The
+    # round trips stay inside the chunk's transaction.
+    stmt = insert(Note.__table__)
+    return [db.execute(stmt, row).lastrowid for row in rows]
+
+
+def _write_chunk(db, user_id, chunk, tags):
+    """
+    Insert one chunk of parsed notes and their note_tags rows, then commit.
+    Returns the line numbers left out because one of their tags could not be
+    resolved.
+    """
+    tags.resolve(db, list(dict.fromkeys(name for _, _, names in chunk for name in names)))
+    unresolved = [line_no for line_no, _, names in chunk if any(name not in tags.ids for name in names)]
+    chunk = [entry for entry in chunk if entry[0] not in unresolved]
+
+    # Tags created by resolve() are committed even if every line was left out,
+    # since the resolver already hands out their ids
+    note_ids = _insert_notes(db, [{**values, "user_id": user_id} for _, values, _ in chunk]) if chunk else []
+    # Names that differ only in case or accents can resolve to the same tag
+    tag_ids = [list(dict.fromkeys(tags.ids[name] for name in names)) for _, _, names in chunk]
+    links = [
+        {"note_id": note_id, "tag_id": tag_id}
+        for note_id, ids in zip(note_ids, tag_ids)
+        for tag_id in ids
+    ]
+    if links:
+        db.execute(insert(note_tags), links)
+        record_links(db, user_id, [
+            (tag_id, note_bucket(values["is_archived"], values["is_deleted"]), 1)
+            for (_, values, _), ids in zip(chunk, tag_ids)
+            for tag_id in ids
+        ])
+    bump_data_version(db, user_id)
+    db.commit()
+    return unresolved
+
+
+def _run_import(user_id, lines, loads):
+    """
+    Import parsed lines chunk by chunk. Yields a progress dict after each committed
+    chunk and a final summary with the per-line errors.
+    """
+    tags = _TagResolver(user_id)
+    summary = {"lines": 0, "imported": 0, "failed": 0, "tags_created": 0, "errors": []}
+
+    def fail(line_no, message):
+        summary["failed"] += 1
+        if len(summary["errors"]) < IMPORT_MAX_ERRORS:
+            summary["errors"].append({"line": line_no, "error": message})
+
+    def flush(db, chunk):
+        known, created = set(tags.ids), tags.created
+        try:
+            unresolved = _write_chunk(db, user_id, chunk, tags)
+            summary["imported"] += len(chunk) - len(unresolved)
+            for line_no in unresolved:
+                fail(line_no, "A tag could not be created")
+            if tags.created > created:
+                tag_cache.invalidate(user_id)
+        except SQLAlchemyError as e:
+            db.rollback()
+            tags.forget(set(tags.ids) - known)
+            tags.created = created
+            message = f"Batch failed: {getattr(e, 'orig', None) or e}"
+            for line_no, _, _ in chunk:
+                fail(line_no, message)
+        summary["tags_created"] = tags.created
+        return {k: summary[k] for k in ("lines", "imported", "failed")}
+
+    with SessionLocal() as db:
+        chunk, chunk_bytes = [], 0
+        for line_no, line in lines:
+            summary["lines"] += 1
+            try:
+                values, names = _parse_note(line, loads, datetime.utcnow())
+            except ImportLineError as e:
+                fail(line_no, str(e))
+                continue
+            chunk.append((line_no, values, names))
+            chunk_bytes += len(line)
+            if len(chunk) >= IMPORT_BATCH_SIZE or chunk_bytes >= IMPORT_BATCH_BYTES:
+                yield flush(db, chunk)
+                chunk, chunk_bytes = [], 0
+        if chunk:
+            yield flush(db, chunk)
+
+    summary["errors_truncated"] = summary["failed"] > len(summary["errors"])
+    yield summary
+
+
+# -----------------------------
+# Import route
+# -----------------------------
+@transfer_bp.route('/notes/import', methods=['POST'])
+def import_notes():
+    """
+    Create notes from an NDJSON body (one note object per line, e.g. an export),
+    creating missing tags by name. Valid lines are committed in chunks; invalid
+    ones are skipped and reported with their line number.
+    `?progress=1` streams NDJSON progress events after each chunk, ending with the
+    summary line; otherwise the summary is returned once the import finishes.
+    """
+    user_id = authenticate()
+    if isinstance(user_id, tuple):
+        return user_id
+
+    loads = current_app.json.loads
+    # request.stream is unbuffered, so readline() on it would read a byte at a time
+    body_stream = io.BufferedReader(request.stream, buffer_size=64 * 1024)
+    events = _run_import(user_id, _import_lines(body_stream), loads)
+
+    if request.args.get("progress") in ("1", "true"):
+        dumps = current_app.json.dumps
+        body = (dumps(event).encode("utf-8") + b"\n" for event in events)
+        # Keeps the request (and its body stream) available while the response is written
+        return Response(stream_with_context(body), mimetype="application/x-ndjson")
+
+    *_, summary = events
+    return jsonify({"success": summary["failed"] == 0, **summary}), 200
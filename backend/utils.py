@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 
 # Correct relative import
 from .models import RevokedToken 
+from .token_cache import token_cache, hash_token
 
 
 def get_user_id_from_token(db: Session):
@@ -20,21 +21,35 @@ def get_user_id_from_token(db: Session):
     # 2. Extract the token
     token = auth_header.split(" ")[1]
 
-    # 3. SQLAlchemy 2.0 check if token is revoked
-    # MODERN QUERY: db.execute(select(...)).scalar_one_or_none()
-    stmt = select(RevokedToken).where(RevokedToken.token == token)
-    revoked = db.execute(stmt).scalar_one_or_none()
-
-    if revoked:
+    # 3. Hot path: token already verified by this worker and not logged out here
+    token_hash = hash_token(token)
+    if token_cache.is_revoked(token_hash):
         return {"error": "Token has been revoked"}
+    cached_user_id = token_cache.get(token_hash)
+    if cached_user_id is not None:
+        return cached_user_id
 
     # 4. Decode token
     try:
         payload = jwt.decode(token, current_app.config["JWT_SECRET_KEY"], algorithms=["HS256"])
-        return int(payload["sub"])
-
     except ExpiredSignatureError:
         return {"error": "Token has expired"}
-
     except JWTError:
-        return {"error": "Invalid token"}
\ No newline at end of file
+        return {"error": "Invalid token"}
+
+    # 5. SQLAlchemy 2.0 check if token is revoked (by its fixed-width jti)
+    # MODERN QUERY: db.execute(select(...)).scalar_one_or_none()
+    stmt = select(RevokedToken.id).where(RevokedToken.jti == token_jti(token, payload))
+    revoked = db.execute(stmt).scalar_one_or_none()
+
+    if revoked:
+        return {"error": "Token has been revoked"}
+
+    user_id = int(payload["sub"])
+    token_cache.put(token_hash, user_id, payload["exp"])
+    return user_id
+
+
+def token_jti(token: str, payload: dict) -> str:
+    """Return the token's `jti`; tokens issued before jti existed fall back to a hash prefix."""
+    return payload.get("jti") or hash_token(token)[:32]
\ No newline at end of file
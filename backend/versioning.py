@@ -0,0 +1,72 @@
+# backend/versioning.py
+
+from datetime import datetime, timezone
+
+from flask import request, g, has_request_context, make_response
+from sqlalchemy import select
+from werkzeug.http import is_resource_modified, quote_etag
+
+from .database import upsert
+from .models import UserDataVersion
+
+
+def bump_data_version(db, user_id):
+    """Record a change to the user's notes/tags; call inside the writing transaction."""
+    now = datetime.utcnow()
+    table = UserDataVersion.__table__
+    db.execute(upsert(
+        db,
+        table,
+        {"user_id": user_id, "version": 1, "changed_at": now},
+        {"version": table.c.version + 1, "changed_at": now},
+        key=["user_id"],
+    ))
+
+
+def conditional_get(db, user_id):
+    """
+    Compare the client's If-None-Match / If-Modified-Since with the user's data
+    version (one primary-key lookup). Returns an empty 304 response when the
+    client's copy is current, otherwise None. Either way the validators are
+    attached to the response by the `add_validators` after_request hook.
+    """
+    row = db.execute(
+        select(UserDataVersion.version, UserDataVersion.changed_at)
+        .where(UserDataVersion.user_id == user_id)
+    ).first()
+    version, changed_at = row if row else (0, None)
+    g.data_version = version
+
+    etag = quote_etag(f"u{user_id}-v{version}", weak=True)
+    last_modified = changed_at.replace(microsecond=0, tzinfo=timezone.utc) if changed_at else None
+    g.data_etag, g.data_last_modified = etag, last_modified
+
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return make_response("", 304)
+    return None
+
+
+def current_data_version(db, user_id):
+    """
+    The user's data version: the one `conditional_get` already read for this
+    request if it ran, otherwise one primary-key lookup.
+    """
+    if has_request_context() and "data_version" in g:
+        return g.data_version
+    version = db.execute(
+        select(UserDataVersion.version).where(UserDataVersion.user_id == user_id)
+    ).scalar()
+    return version or 0
+
+
+def add_validators(response):
+    """after_request hook: attach ETag / Last-Modified recorded by `conditional_get`."""
+    etag = g.get("data_etag")
+    if etag and response.status_code in (200, 304):
+        response.headers["ETag"] = etag
+        if g.get("data_last_modified"):
+            response.last_modified = g.data_last_modified
+        # Per-user data: browsers must revalidate, shared caches must not store
+        response.headers["Cache-Control"] = "private, no-cache"
+        response.vary.add("Authorization")
+    return response